@@ -15,3 +15,6 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
+
+# Record per-task metrics with the celery signals
+import core.utils.celery_metrics  # noqa: E402,F401 isort:skip
@@ -59,6 +59,7 @@ WSGI_APPLICATION = "config.wsgi.application"
 WAGTAIL = [
     "core.home",
     "core.search",
+    "core.packages",
     "wagtail.contrib.forms",
     "wagtail.contrib.redirects",
     "wagtail.contrib.modeladmin",
@@ -190,6 +191,17 @@ STATICFILES_FINDERS = [
 MEDIA_ROOT = str(APPS_DIR / "media")
 # https://docs.djangoproject.com/en/dev/ref/settings/#media-url
 MEDIA_URL = "/media/"
+# https://docs.djangoproject.com/en/dev/ref/settings/#default-file-storage
+# Files with the same content, such as the images of resubmitted packages, are
+# hard links to a single copy (see core.utils.storage). wagtail 2.16 has no
+# storage setting of its own for documents and images, so the backend is the
+# default one and only the files of CONTENT_ADDRESSED_DIRS are content-addressed
+DEFAULT_FILE_STORAGE = env(
+    "DJANGO_DEFAULT_FILE_STORAGE",
+    default="core.utils.storage.ContentAddressedStorage",
+)
+# Directories of the original documents and images
+CONTENT_ADDRESSED_DIRS = ["documents", "original_images"]
 
 # TEMPLATES
 # ------------------------------------------------------------------------------
@@ -307,8 +319,64 @@ CELERY_TASK_TIME_LIMIT = 5 * 60
 # http://docs.celeryproject.org/en/latest/userguide/configuration.html#task-soft-time-limit
 # TODO: set to whatever value is adequate in your circumstances
 CELERY_TASK_SOFT_TIME_LIMIT = 60
+# Times a core.utils.tasks.CheckpointedTask is resumed after its soft time limit
+CELERY_TASK_MAX_RESUMES = env.int("CELERY_TASK_MAX_RESUMES", default=20)
+# Seconds the checkpoint of a CheckpointedTask is kept after it was last saved
+CELERY_TASK_CHECKPOINT_TIMEOUT = 24 * 60 * 60
+# http://docs.celeryproject.org/en/latest/userguide/configuration.html#task-default-queue
+CELERY_TASK_DEFAULT_QUEUE = "default"
+# http://docs.celeryproject.org/en/latest/userguide/configuration.html#task-routes
+# "heavy" is for long CPU/IO jobs and "light" for short latency-sensitive ones,
+# each consumed by the worker profile of the same name (see the worker start)
+CELERY_TASK_ROUTES = {
+    "core.search.tasks.reindex_chunk": {"queue": "heavy"},
+    "core.home.tasks.export_form_submissions": {"queue": "heavy"},
+    "core.home.tasks.send_form_submission_mail": {"queue": "light"},
+    "core.home.tasks.drain_form_submissions": {"queue": "light"},
+    "core.home.tasks.delete_expired_exports": {"queue": "light"},
+    "core.home.tasks.prune_change_log": {"queue": "light"},
+    "core.search.tasks.flush_search_hits": {"queue": "light"},
+    "core.packages.tasks.delete_expired_uploads": {"queue": "light"},
+    "core.packages.tasks.assemble_upload": {"queue": "heavy"},
+    "core.packages.tasks.validate_upload": {"queue": "light"},
+    "core.packages.tasks.validate_xml": {"queue": "heavy"},
+    "core.packages.tasks.save_validation": {"queue": "light"},
+    "core.packages.tasks.collect_storage_garbage": {"queue": "heavy"},
+    "core.packages.tasks.deduplicate_stored_file": {"queue": "heavy"},
+}
 # http://docs.celeryproject.org/en/latest/userguide/configuration.html#beat-scheduler
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+# http://docs.celeryproject.org/en/latest/userguide/configuration.html#beat-schedule
+CELERY_BEAT_SCHEDULE = {
+    "flush-search-hits": {
+        "task": "core.search.tasks.flush_search_hits",
+        "schedule": env.float("SEARCH_HITS_FLUSH_INTERVAL", default=60.0),
+    },
+    "drain-form-submissions": {
+        "task": "core.home.tasks.drain_form_submissions",
+        "schedule": env.float("FORM_SUBMISSIONS_DRAIN_INTERVAL", default=5.0),
+    },
+    "delete-expired-exports": {
+        "task": "core.home.tasks.delete_expired_exports",
+        "schedule": 60 * 60,
+    },
+    "prune-change-log": {
+        "task": "core.home.tasks.prune_change_log",
+        "schedule": 24 * 60 * 60,
+    },
+    "delete-expired-uploads": {
+        "task": "core.packages.tasks.delete_expired_uploads",
+        "schedule": 60 * 60,
+    },
+    "collect-storage-garbage": {
+        "task": "core.packages.tasks.collect_storage_garbage",
+        "schedule": 24 * 60 * 60,
+    },
+}
+# Port of the Prometheus metrics server of the worker, if any
+CELERY_METRICS_PORT = env.int("CELERY_METRICS_PORT", default=None)
+# Bearer token of the scrapers of the celery_metrics view, open to staff users
+CELERY_METRICS_TOKEN = env("CELERY_METRICS_TOKEN", default=None)
 # django-allauth
 # ------------------------------------------------------------------------------
 ACCOUNT_ALLOW_REGISTRATION = env.bool("DJANGO_ACCOUNT_ALLOW_REGISTRATION", True)
@@ -356,3 +424,82 @@ NOCAPTCHA = True
 
 RECAPTCHA_PUBLIC_KEY = env.str("RECAPTCHA_PUBLIC_KEY", default='')
 RECAPTCHA_PRIVATE_KEY = env.str("RECAPTCHA_PRIVATE_KEY", default='')
+
+# Search
+# ------------------------------------------------------------------------------
+# https://docs.wagtail.org/en/stable/topics/search/backends.html
+WAGTAILSEARCH_BACKENDS = {
+    "default": {
+        "BACKEND": "core.search.backend",
+        "SEARCH_CONFIG": "portuguese",
+        # PostgreSQL text search configuration of each of the LANGUAGES
+        "LANGUAGE_SEARCH_CONFIGS": {
+            "en": "english",
+            "es": "spanish",
+            "pt-br": "portuguese",
+            "it": "italian",
+        },
+    }
+}
+# Seconds a list of search result ids stays cached (see core.search.cache)
+SEARCH_RESULTS_CACHE_TIMEOUT = env.int("SEARCH_RESULTS_CACHE_TIMEOUT", default=10 * 60)
+# Maximum number of result ids cached per query
+SEARCH_RESULTS_CACHE_MAX_IDS = env.int("SEARCH_RESULTS_CACHE_MAX_IDS", default=500)
+# Seconds between checks for pages to reload into the autocomplete index
+AUTOCOMPLETE_SYNC_INTERVAL = env.float("AUTOCOMPLETE_SYNC_INTERVAL", default=5.0)
+# Seconds a page change is kept for the autocomplete index of other processes
+AUTOCOMPLETE_JOURNAL_TIMEOUT = 60 * 60
+# Maximum number of titles returned per autocomplete request
+AUTOCOMPLETE_LIMIT = 8
+# Objects written to the index between two checkpoints of a reindex chunk
+SEARCH_REINDEX_BATCH_SIZE = env.int("SEARCH_REINDEX_BATCH_SIZE", default=200)
+
+# API
+# ------------------------------------------------------------------------------
+# Seconds a response of the wagtail API to anonymous users stays cached
+API_CACHE_TIMEOUT = env.int("API_CACHE_TIMEOUT", default=10 * 60)
+# Objects read per query by the NDJSON export of the API endpoints
+API_EXPORT_CHUNK_SIZE = env.int("API_EXPORT_CHUNK_SIZE", default=500)
+# Default and maximum number of changes returned per request of the changes feed
+API_CHANGES_LIMIT = 100
+API_CHANGES_LIMIT_MAX = 1000
+# Days a change is kept in the changes feed; harvesters away for longer must
+# crawl the endpoints again
+API_CHANGES_RETENTION = env.int("API_CHANGES_RETENTION", default=90)
+
+# Forms
+# ------------------------------------------------------------------------------
+# Form submissions exported in the request, as a streamed CSV; larger exports
+# run in a Celery task that emails a download link
+FORM_EXPORT_STREAM_LIMIT = env.int("FORM_EXPORT_STREAM_LIMIT", default=10000)
+# Submissions read per round trip of the export cursor
+FORM_EXPORT_CHUNK_SIZE = 2000
+# Private directory of the exports, served to the editors of their form only
+FORM_EXPORTS_ROOT = env("FORM_EXPORTS_ROOT", default=str(ROOT_DIR / "form-exports"))
+# Seconds an export is kept
+FORM_EXPORT_EXPIRY = 7 * 24 * 60 * 60
+# Buffer valid form submissions in Redis and write them in batches
+FORM_SUBMISSIONS_WRITE_BEHIND = env.bool("FORM_SUBMISSIONS_WRITE_BEHIND", default=False)
+# Buffered submissions written per bulk INSERT
+FORM_SUBMISSIONS_BATCH_SIZE = 500
+# Failed drains of a batch before it is moved to the dead-letter list
+FORM_SUBMISSIONS_MAX_ATTEMPTS = 5
+# Seconds the idempotency key of a buffered submission is kept
+FORM_SUBMISSIONS_RECEIPT_TIMEOUT = 24 * 60 * 60
+
+# Packages
+# ------------------------------------------------------------------------------
+# Directory of the packages being uploaded, MEDIA_ROOT/partial-uploads when
+# empty; on the filesystem of MEDIA_ROOT a complete upload is only renamed
+PACKAGE_UPLOADS_ROOT = env("PACKAGE_UPLOADS_ROOT", default="")
+# Largest package accepted by the upload API, in bytes
+PACKAGE_UPLOAD_MAX_SIZE = env.int("PACKAGE_UPLOAD_MAX_SIZE", default=20 * 1024**3)
+# Seconds an upload that receives no chunk is kept
+PACKAGE_UPLOAD_EXPIRY = 7 * 24 * 60 * 60
+# DTD, XSD and Schematron files the XML of the packages are validated with,
+# compiled once per process (see core.packages.validation)
+PACKAGE_XML_DTD = env("PACKAGE_XML_DTD", default="")
+PACKAGE_XML_SCHEMA = env("PACKAGE_XML_SCHEMA", default="")
+PACKAGE_XML_SCHEMATRON = env("PACKAGE_XML_SCHEMATRON", default="")
+# Processes of the validate_package command, one per core when 0
+PACKAGE_VALIDATION_WORKERS = env.int("PACKAGE_VALIDATION_WORKERS", default=0)
@@ -11,6 +11,7 @@ from wagtail.documents import urls as wagtaildocs_urls
 
 from core.api import api_router
 from core.search import views as search_views  # noqa isort:skip
+from core.utils import celery_metrics  # noqa isort:skip
 
 urlpatterns = [
     path("", TemplateView.as_view(template_name="home/home_page.html"), name="home"),
@@ -22,6 +23,10 @@ urlpatterns = [
     # Wagtail Admin
     path(settings.WAGTAIL_ADMIN_URL, include(wagtailadmin_urls)),
     re_path(r"^documents/", include(wagtaildocs_urls)),
+    # Celery metrics in the Prometheus text format, for staff and scrapers
+    path("metrics/celery/", celery_metrics.metrics_view, name="celery_metrics"),
+    # Resumable uploads of packages
+    path("api/uploads/", include("core.packages.urls", namespace="packages")),
     # Your stuff: custom urls includes go here
     # For anything not caught by a more specific rule above, hand over to
     # Wagtail’s page serving mechanism. This should be the last pattern in
@@ -36,6 +41,7 @@ urlpatterns = [
 # These will be available under a language code prefix. For example /en/search/
 urlpatterns += i18n_patterns(
     re_path(r"^search/$", search_views.search, name="search"),
+    re_path(r"^search/autocomplete/$", search_views.autocomplete, name="autocomplete"),
     # User management
     path("api/v2/", api_router.urls),
     path("users/", include("core.users.urls", namespace="users")),
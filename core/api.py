@@ -1,7 +1,511 @@
-from wagtail.api.v2.views import PagesAPIViewSet
+import base64
+import binascii
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import path
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from wagtail.api.v2.filters import OrderingFilter, SearchFilter
+from wagtail.api.v2.pagination import WagtailPagination
 from wagtail.api.v2.router import WagtailAPIRouter
-from wagtail.images.api.v2.views import ImagesAPIViewSet
+from wagtail.api.v2.utils import (
+    BadRequestError,
+    get_object_detail_url,
+    parse_fields_parameter,
+)
+from wagtail.api.v2.views import BaseAPIViewSet, PagesAPIViewSet
+from wagtail.core.models import Page
+from wagtail.documents import get_document_model
 from wagtail.documents.api.v2.views import DocumentsAPIViewSet
+from wagtail.images import get_image_model
+from wagtail.images.api.v2.views import ImagesAPIViewSet
+
+from core.home.models import ChangeLog
+from core.utils.cache import get_generation
+
+# Oldest transaction still in progress, and the current one if it wrote
+TRANSACTIONS_XMIN = "txid_snapshot_xmin(txid_current_snapshot())"
+CURRENT_TRANSACTION_ID = "txid_current_if_assigned()"
+
+# Bumped whenever live pages are created, published, unpublished (deleted
+# too) or moved and whenever images or documents change (see
+# core.home.signals)
+PAGES_GENERATION = "api:pages"
+IMAGES_GENERATION = "api:images"
+DOCUMENTS_GENERATION = "api:documents"
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET requests with an ETag, returning 304 Not Modified when the
+    client copy is still fresh, and keep the rendered responses to anonymous
+    users in the shared cache.
+
+    The ETag follows the ``generation`` of the endpoint, bumped by the
+    signals of every change of its objects, so a fresh or cached response
+    is served without any query. It covers the renderer picked for the
+    request, JSON or browsable HTML, so the responses vary on the Accept
+    header.
+    """
+
+    generation = None
+
+    def get_renderer_format(self, request, **kwargs):
+        """Return the format of the renderer negotiated for ``request``, if any."""
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        try:
+            renderer, __ = self.perform_content_negotiation(
+                self.initialize_request(request, **kwargs)
+            )
+        except (NotAcceptable, Http404):
+            return None
+        return renderer.format
+
+    def get_etag(self, request, renderer_format):
+        data = repr(
+            (get_generation(self.generation), request.get_full_path(), renderer_format)
+        )
+        return quote_etag(hashlib.md5(data.encode()).hexdigest())
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        renderer_format = self.get_renderer_format(request, **kwargs)
+        if renderer_format is None:
+            # answered with an error by the usual negotiation
+            return super().dispatch(request, *args, **kwargs)
+
+        etag = self.get_etag(request, renderer_format)
+        response = get_conditional_response(request, etag=etag)
+
+        if response is None:
+            cache_key = None
+            if not request.user.is_authenticated:
+                cache_key = "api:response:%s:%s" % (renderer_format, etag.strip('"'))
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    content, content_type = cached
+                    response = HttpResponse(content, content_type=content_type)
+
+            if response is None:
+                response = super().dispatch(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                if cache_key and not response.streaming:
+                    response.render()
+                    cache.set(
+                        cache_key,
+                        (response.content, response["Content-Type"]),
+                        timeout=settings.API_CACHE_TIMEOUT,
+                    )
+
+        response["ETag"] = etag
+        patch_vary_headers(response, ["Accept"])
+        return response
+
+
+class ExportMixin:
+    """
+    Add an ``export/`` view streaming every object of the endpoint as
+    newline delimited JSON, in primary key order.
+
+    Objects are read in keyset chunks (``pk > last pk``) so memory stays
+    constant and no query pays for an OFFSET. An interrupted export resumes
+    from the last id received with ``?after=<id>``. The ``fields`` parameter
+    and the field filters of the listing apply; ordering and search do not.
+    """
+
+    export_query_parameters = frozenset(["after"])
+    listing_only_query_parameters = frozenset(
+        ["limit", "offset", "cursor", "order", "search", "search_operator"]
+    )
+
+    @classmethod
+    def get_urlpatterns(cls):
+        return super().get_urlpatterns() + [
+            path("export/", cls.as_view({"get": "export_view"}), name="export"),
+        ]
+
+    def get_export_queryset(self):
+        queryset = self.get_queryset()
+        self.known_query_parameters = (
+            self.known_query_parameters - self.listing_only_query_parameters
+        ) | self.export_query_parameters
+        self.check_query_parameters(queryset)
+        for backend in self.filter_backends:
+            if backend not in (OrderingFilter, SearchFilter):
+                queryset = backend().filter_queryset(self.request, queryset, self)
+        return queryset.order_by("pk")
+
+    def iter_export(self, queryset, after, serializer):
+        chunk_size = settings.API_EXPORT_CHUNK_SIZE
+        while True:
+            if after is not None:
+                chunk = list(queryset.filter(pk__gt=after)[:chunk_size])
+            else:
+                chunk = list(queryset[:chunk_size])
+            for instance in chunk:
+                data = serializer.to_representation(instance)
+                yield json.dumps(data, cls=JSONEncoder) + "\n"
+            if len(chunk) < chunk_size:
+                return
+            after = chunk[-1].pk
+
+    def export_view(self, request):
+        try:
+            after = int(request.GET["after"]) if "after" in request.GET else None
+        except ValueError:
+            raise BadRequestError("after must be an integer")
+
+        queryset = self.get_export_queryset()
+        try:
+            fields_config = parse_fields_parameter(request.GET.get("fields", ""))
+        except ValueError as e:
+            raise BadRequestError("fields error: %s" % str(e))
+        # the id is always exported, it is the position to resume from
+        fields_config.append(("id", False, None))
+        serializer_class = self._get_serializer_class(
+            request.wagtailapi_router, queryset.model, fields_config
+        )
+        serializer = serializer_class(context=self.get_serializer_context())
+        return StreamingHttpResponse(
+            self.iter_export(queryset, after, serializer),
+            content_type="application/x-ndjson",
+        )
+
+
+class CursorPagination(WagtailPagination):
+    """
+    Offset pagination, or keyset pagination when ``?cursor`` is given.
+
+    The listing is then ordered by the ``order`` field (id by default, the
+    id of the related object for a foreign key), nulls last, and the
+    primary key. ``?cursor=`` asks for the first page
+    and every page returns the opaque ``next_cursor`` of the next one,
+    which encodes the sort value and id of its last item. Each page is
+    fetched by an index seek from that position, whatever its depth, and
+    publishing does not shift the pages already seen.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = "cursor" in request.GET
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        if "offset" in request.GET:
+            raise BadRequestError("cursor and offset cannot be used together")
+        if "search" in request.GET:
+            raise BadRequestError("cursor is not supported with search")
+
+        order = request.GET.get("order", "id")
+        if order == "random":
+            raise BadRequestError("cursor is not supported with random ordering")
+        descending = order.startswith("-")
+        field = order.lstrip("-")
+        if field in ("pk", queryset.model._meta.pk.name):
+            field = None
+        else:
+            field = self.get_seek_field(queryset.model, field)
+        limit = self.get_limit(request)
+        position = self.decode_cursor(request.GET["cursor"], order)
+
+        if not queryset.query.standard_ordering:
+            # undo the reverse() of OrderingFilter, the ordering is explicit here
+            queryset = queryset.reverse()
+        queryset = queryset.order_by(*self.get_ordering(field, descending))
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_seek_filter(field, descending, *position)
+            )
+
+        items = list(queryset[: limit + 1])
+        self.next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            value = getattr(items[-1], field) if field else None
+            self.next_cursor = self.encode_cursor(order, value, items[-1].pk)
+        return items
+
+    def get_limit(self, request):
+        limit_max = getattr(settings, "WAGTAILAPI_LIMIT_MAX", 20)
+        try:
+            limit = int(request.GET.get("limit", min(20, limit_max or 20)))
+            # a page must hold the item the next cursor is taken from
+            if limit < 1:
+                raise ValueError()
+        except ValueError:
+            raise BadRequestError("limit must be a positive integer")
+        if limit_max and limit > limit_max:
+            raise BadRequestError("limit cannot be higher than %d" % limit_max)
+        return limit
+
+    def get_seek_field(self, model, name):
+        """Return the column ordered by ``name``, the id of a foreign key."""
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            field = None
+        if field is None or not field.concrete or field.many_to_many:
+            raise BadRequestError("cursor is not supported with order %s" % name)
+        return field.attname
+
+    def get_ordering(self, field, descending):
+        direction = "desc" if descending else "asc"
+        ordering = [getattr(F("pk"), direction)()]
+        if field:
+            ordering.insert(0, getattr(F(field), direction)(nulls_last=True))
+        return ordering
+
+    def get_seek_filter(self, field, descending, value, pk):
+        """Return the condition of the items after ``(value, pk)``."""
+        lookup = "lt" if descending else "gt"
+        after = Q(**{"pk__%s" % lookup: pk})
+        if field is None:
+            return after
+        if value is None:
+            # the position is within the nulls at the end
+            return Q(**{"%s__isnull" % field: True}) & after
+        return (
+            Q(**{"%s__%s" % (field, lookup): value})
+            | Q(**{field: value}) & after
+            | Q(**{"%s__isnull" % field: True})
+        )
+
+    def encode_cursor(self, order, value, pk):
+        # str() keeps the microseconds of datetimes, unlike the JSON encoders
+        data = json.dumps([order, value, pk], default=str)
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, cursor, order):
+        """Return the ``(value, pk)`` encoded in ``cursor``, None if empty."""
+        if not cursor:
+            return None
+        try:
+            cursor_order, value, pk = json.loads(base64.urlsafe_b64decode(cursor))
+        except (binascii.Error, ValueError, TypeError):
+            raise BadRequestError("invalid cursor")
+        if cursor_order != order:
+            raise BadRequestError("cursor was created with another order")
+        return value, pk
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(
+            OrderedDict(
+                [
+                    ("meta", OrderedDict([("next_cursor", self.next_cursor)])),
+                    ("items", data),
+                ]
+            )
+        )
+
+
+class ProjectedPagesAPIViewSet(PagesAPIViewSet):
+    """
+    Plan the listing queryset from the fields the client asked for: load
+    only the columns they are serialized from, join the foreign keys and
+    prefetch the child relations, so that the number of queries of a
+    listing does not grow with its size.
+    """
+
+    # Columns read by the fields that are not model fields themselves
+    field_columns = {
+        "id": ["id"],
+        "type": ["content_type"],
+        "detail_url": ["id"],
+        "html_url": ["url_path"],
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ("listing_view", "export_view"):
+            queryset = self.plan_queryset(queryset)
+        return queryset
+
+    def get_listing_fields(self, model):
+        """Return the names of the fields serialized for ``model``, if valid."""
+        try:
+            fields_config = parse_fields_parameter(self.request.GET.get("fields", ""))
+            serializer_class = self._get_serializer_class(
+                self.request.wagtailapi_router, model, fields_config
+            )
+        except (ValueError, BadRequestError):
+            # reported by get_serializer_class
+            return None
+        return serializer_class.Meta.fields
+
+    def plan_queryset(self, queryset):
+        fields = self.get_listing_fields(queryset.model)
+        if fields is None:
+            return queryset
+
+        columns = {"id", "content_type", "url_path", "title"}
+        select_related = []
+        prefetch_related = []
+        projectable = True
+        for name in fields:
+            columns.update(self.field_columns.get(name, []))
+            try:
+                field = queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # properties may read any column
+                projectable = projectable and name in self.field_columns
+                continue
+            if field.many_to_one or field.one_to_one:
+                select_related.append(name)
+            elif field.is_relation:
+                prefetch_related.append(name)
+            if field.concrete:
+                columns.add(name)
+
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if projectable:
+            queryset = queryset.only(*columns)
+        return queryset
+
+
+class CachedPagesAPIViewSet(ConditionalGetMixin, ExportMixin, ProjectedPagesAPIViewSet):
+    pagination_class = CursorPagination
+    known_query_parameters = PagesAPIViewSet.known_query_parameters | {"cursor"}
+    generation = PAGES_GENERATION
+
+
+class CachedImagesAPIViewSet(ConditionalGetMixin, ExportMixin, ImagesAPIViewSet):
+    pagination_class = CursorPagination
+    known_query_parameters = ImagesAPIViewSet.known_query_parameters | {"cursor"}
+    generation = IMAGES_GENERATION
+
+
+class CachedDocumentsAPIViewSet(ConditionalGetMixin, ExportMixin, DocumentsAPIViewSet):
+    pagination_class = CursorPagination
+    known_query_parameters = DocumentsAPIViewSet.known_query_parameters | {"cursor"}
+    generation = DOCUMENTS_GENERATION
+
+
+class ChangesAPIViewSet(BaseAPIViewSet):
+    """
+    Feed of the pages, images and documents changed since a cursor, for
+    harvesters to pull deltas instead of crawling every endpoint again.
+
+    ``?since=<cursor>`` returns the changes committed after it in log order
+    and the cursor to ask from next time; ``?type=page,image`` restricts the
+    object types. The log is read in the order of the transactions that
+    wrote it (see ``core.home.models.ChangeLog``), so a change committed
+    after a later one was read is still returned. Changes older than
+    API_CHANGES_RETENTION days are pruned.
+    """
+
+    model = ChangeLog
+    known_query_parameters = frozenset(["since", "limit", "type"])
+    object_models = {
+        ChangeLog.PAGE: Page,
+        ChangeLog.IMAGE: get_image_model(),
+        ChangeLog.DOCUMENT: get_document_model(),
+    }
+
+    @classmethod
+    def get_urlpatterns(cls):
+        return [
+            path("", cls.as_view({"get": "listing_view"}), name="listing"),
+        ]
+
+    def check_query_parameters(self, queryset):
+        unknown_parameters = set(self.request.GET) - self.known_query_parameters
+        if unknown_parameters:
+            raise BadRequestError(
+                "query parameter is not an operation: %s"
+                % ", ".join(sorted(unknown_parameters))
+            )
+
+    def get_cursor(self):
+        """Return the ``(transaction_id, id)`` of the ``since`` cursor."""
+        since = self.request.GET.get("since") or "0.0"
+        try:
+            transaction_id, change_id = map(int, since.split("."))
+        except ValueError:
+            raise BadRequestError("since must be a cursor returned by this feed")
+        return transaction_id, change_id
+
+    def get_queryset(self):
+        transaction_id, change_id = self.get_cursor()
+        queryset = (
+            ChangeLog.objects.filter(
+                Q(transaction_id__gt=transaction_id)
+                | Q(transaction_id=transaction_id, id__gt=change_id)
+            )
+            # changes of the transactions still in progress commit later with a
+            # transaction id no lower than the oldest of them, so the changes
+            # from that id on are held back and the cursor never skips one;
+            # the changes of the current transaction are visible to it already
+            .filter(
+                Q(transaction_id__lt=RawSQL(TRANSACTIONS_XMIN, []))
+                | Q(transaction_id=RawSQL(CURRENT_TRANSACTION_ID, []))
+            ).order_by("transaction_id", "id")
+        )
+        if "type" in self.request.GET:
+            object_types = self.request.GET["type"].split(",")
+            if not set(object_types) <= set(self.object_models):
+                raise BadRequestError("type doesn't exist")
+            queryset = queryset.filter(object_type__in=object_types)
+        return queryset
+
+    def get_item(self, change):
+        item = {
+            "id": change.id,
+            "type": change.object_type,
+            "object_id": change.object_id,
+            "action": change.action,
+            "created_at": change.created_at,
+        }
+        if change.action != ChangeLog.DELETED:
+            item["detail_url"] = get_object_detail_url(
+                self.request.wagtailapi_router,
+                self.request,
+                self.object_models[change.object_type],
+                change.object_id,
+            )
+        return item
+
+    def listing_view(self, request):
+        queryset = self.get_queryset()
+        self.check_query_parameters(queryset)
+        try:
+            limit = int(request.GET.get("limit", settings.API_CHANGES_LIMIT))
+        except ValueError:
+            raise BadRequestError("limit must be an integer")
+        if not 0 < limit <= settings.API_CHANGES_LIMIT_MAX:
+            raise BadRequestError(
+                "limit must be between 1 and %s" % settings.API_CHANGES_LIMIT_MAX
+            )
+
+        changes = list(queryset[: limit + 1])
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        if changes:
+            cursor = changes[-1].transaction_id, changes[-1].id
+        else:
+            cursor = self.get_cursor()
+        return Response(
+            {
+                "meta": {"since": "%s.%s" % cursor, "has_more": has_more},
+                "items": [self.get_item(change) for change in changes],
+            }
+        )
+
 
 # Create the router. "wagtailapi" is the URL namespace
 api_router = WagtailAPIRouter('wagtailapi')
@@ -10,6 +514,7 @@ api_router = WagtailAPIRouter('wagtailapi')
 # The first parameter is the name of the endpoint (eg. pages, images). This
 # is used in the URL of the endpoint
 # The second parameter is the endpoint class that handles the requests
-api_router.register_endpoint('pages', PagesAPIViewSet)
-api_router.register_endpoint('images', ImagesAPIViewSet)
-api_router.register_endpoint('documents', DocumentsAPIViewSet)
+api_router.register_endpoint('pages', CachedPagesAPIViewSet)
+api_router.register_endpoint('images', CachedImagesAPIViewSet)
+api_router.register_endpoint('documents', CachedDocumentsAPIViewSet)
+api_router.register_endpoint('changes', ChangesAPIViewSet)
@@ -1,14 +1,21 @@
 import pytest
 
+from core.home.models import HomePage
 from core.users.models import User
 from core.users.tests.factories import UserFactory
 
 
 @pytest.fixture(autouse=True)
-def media_storage(settings, tmpdir):
+def media_storage(settings, tmpdir, tmpdir_factory):
     settings.MEDIA_ROOT = tmpdir.strpath
+    settings.FORM_EXPORTS_ROOT = tmpdir_factory.mktemp("form-exports").strpath
 
 
 @pytest.fixture
 def user() -> User:
     return UserFactory()
+
+
+@pytest.fixture
+def home_page() -> HomePage:
+    return HomePage.objects.get(slug="home", depth=2)
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.utils.translation import gettext_lazy as _
+
+
+class HomeConfig(AppConfig):
+    name = "core.home"
+    verbose_name = _("Home")
+
+    def ready(self):
+        try:
+            import core.home.signals  # noqa F401
+        except ImportError:
+            pass
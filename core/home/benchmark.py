@@ -0,0 +1,70 @@
+"""
+Synthetic multilingual site used by the ``benchmark`` management command.
+"""
+import random
+
+from django.conf import settings
+from wagtail.core.models import Locale
+
+from core.home.models import FormField, FormPage, HomePage
+
+WORDS = {
+    "en": "science journal article research health education open access review",
+    "es": "ciencia revista artículo investigación salud educación acceso abierto",
+    "pt-BR": "ciência revista artigo pesquisa saúde educação acesso aberto",
+    "it": "scienza rivista articolo ricerca salute educazione accesso aperto",
+}
+
+
+def get_words(language_code):
+    return WORDS.get(language_code, WORDS["en"]).split()
+
+
+def get_title(language_code, rnd):
+    return " ".join(rnd.sample(get_words(language_code), 3)).capitalize()
+
+
+def get_language_roots(home_page):
+    """Return ``{language_code: home page}`` with one root per content language."""
+    roots = {home_page.locale.language_code: home_page}
+    for language_code, __ in settings.WAGTAIL_CONTENT_LANGUAGES:
+        if language_code in roots:
+            continue
+        locale, __ = Locale.objects.get_or_create(language_code=language_code)
+        roots[language_code] = home_page.get_translation_or_none(
+            locale
+        ) or home_page.copy_for_translation(locale)
+        roots[language_code].save_revision().publish()
+    return roots
+
+
+def create_site(home_page, pages, seed=0):
+    """
+    Create ``pages`` HomePage trees of one FormPage each under the root of
+    every content language, returning ``{language_code: [pages]}``.
+    """
+    rnd = random.Random(seed)
+    created = {}
+    for language_code, root in get_language_roots(home_page).items():
+        created[language_code] = []
+        for number in range(pages):
+            section = root.add_child(
+                instance=HomePage(
+                    title=get_title(language_code, rnd),
+                    slug="bench-%s" % number,
+                    locale=root.locale,
+                )
+            )
+            form_page = section.add_child(
+                instance=FormPage(
+                    title=get_title(language_code, rnd),
+                    slug="form",
+                    locale=root.locale,
+                    intro="<p>%s</p>" % get_title(language_code, rnd),
+                )
+            )
+            FormField.objects.create(
+                page=form_page, label="Name", field_type="singleline", required=True
+            )
+            created[language_code].extend([section, form_page])
+    return created
@@ -0,0 +1,92 @@
+"""
+CSV export of the submissions of a form page, written row by row.
+
+Submissions are read through a server-side cursor, a chunk at a time, and
+never held in memory all together. Small exports stream straight to the
+browser; larger ones are written by the
+``core.home.tasks.export_form_submissions`` Celery task to the private
+``FORM_EXPORTS_ROOT``, outside MEDIA_ROOT, under an unguessable name, and
+downloaded through a view checking the permissions on their form until they
+expire.
+"""
+import csv
+import datetime
+import json
+import secrets
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+
+class Echo:
+    """File-like object returning what is written, for streaming csv rows."""
+
+    def write(self, value):
+        return value
+
+
+def format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    if isinstance(value, datetime.datetime):
+        return timezone.localtime(value).isoformat()
+    return value
+
+
+def iter_rows(page):
+    """Yield the heading row, then one row per submission of ``page``."""
+    data_fields = page.get_data_fields()
+    yield [str(label) for __, label in data_fields]
+
+    submissions = (
+        page.get_submission_class()
+        .objects.filter(page=page)
+        .order_by("submit_time", "id")
+        .values_list("submit_time", "form_data")
+    )
+    for submit_time, form_data in submissions.iterator(
+        chunk_size=settings.FORM_EXPORT_CHUNK_SIZE
+    ):
+        data = json.loads(form_data)
+        data["submit_time"] = submit_time
+        yield [format_value(data.get(name)) for name, __ in data_fields]
+
+
+def iter_csv(page):
+    writer = csv.writer(Echo())
+    for row in iter_rows(page):
+        yield writer.writerow(row)
+
+
+def write_csv(page, fp):
+    csv.writer(fp).writerows(iter_rows(page))
+
+
+def get_export_filename(page):
+    return "%s-%s.csv" % (page.pk, timezone.now().strftime("%Y%m%d%H%M%S"))
+
+
+def get_exports_storage():
+    return FileSystemStorage(location=settings.FORM_EXPORTS_ROOT)
+
+
+def get_export_name(page):
+    """Return an unguessable name for an export of ``page``."""
+    return "%s-%s.csv" % (page.pk, secrets.token_urlsafe(32))
+
+
+def prune_exports():
+    """Delete the exports older than FORM_EXPORT_EXPIRY and return how many."""
+    storage = get_exports_storage()
+    if not storage.exists(""):
+        return 0
+    expired = timezone.now() - datetime.timedelta(seconds=settings.FORM_EXPORT_EXPIRY)
+    count = 0
+    for name in storage.listdir("")[1]:
+        if storage.get_modified_time(name) < expired:
+            storage.delete(name)
+            count += 1
+    return count
@@ -0,0 +1,121 @@
+import json
+import random
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone, translation
+from wagtail.core.models import Site
+
+from core.home.benchmark import create_site, get_words
+from core.utils.benchmark import compare, measure
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Create a synthetic multilingual site inside a transaction that is rolled "
+        "back, and measure the latency and queries of the search view, the pages "
+        "API and page serving. Do not run it against a production database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=50,
+            help="Number of HomePage/FormPage trees created per language",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of times each URL is requested",
+        )
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument(
+            "--compare", help="Baseline JSON file to compare the results with"
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Relative worsening over the baseline reported as regression",
+        )
+
+    def handle(self, pages, repeat, output, compare, tolerance, **options):
+        try:
+            # allows the test client host and keeps emails in memory
+            setup_test_environment()
+            teardown = True
+        except RuntimeError:
+            # already set up by the test runner
+            teardown = False
+        try:
+            # the requests activate their own language, restore it afterwards
+            with transaction.atomic(), translation.override(translation.get_language()):
+                results = self.run(pages, repeat)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            if teardown:
+                teardown_test_environment()
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "pages": pages,
+            "repeat": repeat,
+            "results": results,
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+        if output:
+            with open(output, "w") as fp:
+                json.dump(report, fp, indent=2)
+
+        if compare:
+            self.compare(compare, results, tolerance)
+
+    def run(self, pages, repeat):
+        site = Site.objects.get(is_default_site=True)
+        created = create_site(site.root_page.specific, pages)
+        client = Client()
+
+        search_urls = []
+        api_urls = []
+        for language_code in created:
+            with translation.override(language_code):
+                search_urls.extend(
+                    "%s?%s" % (reverse("search"), urlencode({"query": word}))
+                    for word in get_words(language_code)[:3]
+                )
+                api_urls.append(reverse("wagtailapi:pages:listing") + "?limit=20")
+
+        rnd = random.Random(0)
+        page_urls = [
+            page.get_url()
+            for language_pages in created.values()
+            for page in rnd.sample(language_pages, min(5, len(language_pages)))
+        ]
+
+        return {
+            "search": measure(client, search_urls, repeat),
+            "api_pages": measure(client, api_urls, repeat),
+            "page_serving": measure(client, page_urls, repeat),
+        }
+
+    def compare(self, path, results, tolerance):
+        with open(path) as fp:
+            baseline = json.load(fp)["results"]
+        regressions = compare(baseline, results, tolerance)
+        for name, metric, before, after in regressions:
+            self.stderr.write("%s %s: %s -> %s" % (name, metric, before, after))
+        if regressions:
+            raise CommandError("%d regressions over %s" % (len(regressions), path))
+        self.stdout.write(self.style.SUCCESS("No regressions over %s" % path))
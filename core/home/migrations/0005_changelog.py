@@ -0,0 +1,27 @@
+# Generated by Django 3.2.12 on 2026-10-17 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0004_remove_formpage_text_right'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(choices=[('page', 'Page'), ('image', 'Image'), ('document', 'Document')], max_length=16)),
+                ('object_id', models.PositiveIntegerField()),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('published', 'Published'), ('unpublished', 'Unpublished'), ('deleted', 'Deleted')], max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['object_type', 'id'], name='home_change_object__99d952_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.12 on 2026-10-17 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0005_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionReceipt',
+            fields=[
+                ('key', models.UUIDField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
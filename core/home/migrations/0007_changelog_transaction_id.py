@@ -0,0 +1,31 @@
+# Generated by Django 3.2.12 on 2026-10-17 06:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0006_submissionreceipt'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='changelog',
+            name='home_change_object__99d952_idx',
+        ),
+        migrations.AddField(
+            model_name='changelog',
+            name='transaction_id',
+            field=models.BigIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['transaction_id', 'id'], name='home_change_transac_c17dba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['object_type', 'transaction_id', 'id'], name='home_change_object__9fa2ce_idx'),
+        ),
+    ]
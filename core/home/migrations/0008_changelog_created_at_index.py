@@ -0,0 +1,18 @@
+# Generated by Django 3.2.12 on 2026-10-17 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0007_changelog_transaction_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='changelog',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -1,6 +1,10 @@
-from django.db import models
+from functools import partial
+
+from django.conf import settings
+from django.db import models, transaction
 from django.http import JsonResponse
 from django.template.response import TemplateResponse
+from django.utils.translation import gettext_lazy as _
 
 from wagtail.core.models import Page
 
@@ -13,8 +17,20 @@ from wagtail.core.fields import RichTextField
 from wagtail.contrib.forms.models import AbstractFormField
 from wagtail.contrib.forms.edit_handlers import FormSubmissionsPanel
 
+from wagtailcaptcha.forms import remove_captcha_field
 from wagtailcaptcha.models import WagtailCaptchaEmailForm
 
+from core.home.submissions import buffer_submission
+
+from core.home.tasks import send_form_submission_mail
+from core.utils.cache import get_generation
+
+# Bumped when a form page is published (see core.home.signals)
+FORM_GENERATION = "form-page:%s"
+
+# Form classes built by FormPage.get_form_class, by page id
+_form_classes = {}
+
 
 class HomePage(Page):
     pass
@@ -55,6 +71,40 @@ class FormPage(WagtailCaptchaEmailForm):
             context
         )
 
+    def get_form_class(self):
+        # Form fields held in memory, as in previews, are never cached
+        if self.pk is None or 'form_fields' in getattr(self, '_cluster_related_objects', {}):
+            return super().get_form_class()
+
+        version = (self.live_revision_id, get_generation(FORM_GENERATION % self.pk))
+        cached = _form_classes.get(self.pk)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        form_class = super().get_form_class()
+        _form_classes[self.pk] = (version, form_class)
+        return form_class
+
+    def process_form_submission(self, form):
+        if not settings.FORM_SUBMISSIONS_WRITE_BEHIND:
+            return super().process_form_submission(form)
+
+        # Saved in bulk later by the drain_form_submissions task
+        remove_captcha_field(form)
+        submission = buffer_submission(self, form)
+        if self.to_address:
+            self.send_mail(form)
+        return submission
+
+    def send_mail(self, form):
+        # Sent by a celery task once the submission is committed, so that a
+        # slow SMTP relay does not hold the request
+        addresses = [x.strip() for x in self.to_address.split(',')]
+        transaction.on_commit(partial(
+            send_form_submission_mail.delay,
+            self.subject, self.render_email(form), addresses, self.from_address,
+        ))
+
     class Meta:
         verbose_name = "Página com formulário."
         verbose_name_plural = "Páginas com formulários."
@@ -72,3 +122,72 @@ class FormPage(WagtailCaptchaEmailForm):
             FieldPanel('subject'),
         ], "Email"),
     ]
+
+
+class CurrentTransactionId(models.Func):
+    """The 64 bits id of the current PostgreSQL transaction."""
+
+    function = "txid_current"
+    output_field = models.BigIntegerField()
+
+
+class ChangeLog(models.Model):
+    """
+    A page, image or document created, changed or removed, read in
+    transaction and id order by the changes API feed (see
+    ``core.api.ChangesAPIViewSet``).
+
+    Ids are assigned on insert but rows become visible on commit, so the
+    feed follows the id of the transaction that logged each change, which
+    lets it hold back the rows of the transactions still in progress.
+    Changes are kept API_CHANGES_RETENTION days (see
+    ``core.home.tasks.prune_change_log``).
+    """
+
+    PAGE = "page"
+    IMAGE = "image"
+    DOCUMENT = "document"
+    OBJECT_TYPE_CHOICES = [
+        (PAGE, _("Page")),
+        (IMAGE, _("Image")),
+        (DOCUMENT, _("Document")),
+    ]
+
+    CREATED = "created"
+    UPDATED = "updated"
+    PUBLISHED = "published"
+    UNPUBLISHED = "unpublished"
+    DELETED = "deleted"
+    ACTION_CHOICES = [
+        (CREATED, _("Created")),
+        (UPDATED, _("Updated")),
+        (PUBLISHED, _("Published")),
+        (UNPUBLISHED, _("Unpublished")),
+        (DELETED, _("Deleted")),
+    ]
+
+    object_type = models.CharField(max_length=16, choices=OBJECT_TYPE_CHOICES)
+    object_id = models.PositiveIntegerField()
+    action = models.CharField(max_length=16, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # set to CurrentTransactionId() on insert
+    transaction_id = models.BigIntegerField(editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["transaction_id", "id"]),
+            models.Index(fields=["object_type", "transaction_id", "id"]),
+        ]
+
+    def __str__(self):
+        return "%s %s %s" % (self.object_type, self.object_id, self.action)
+
+
+class SubmissionReceipt(models.Model):
+    """
+    Idempotency key of a form submission written by the write-behind buffer
+    (see ``core.home.submissions``).
+    """
+
+    key = models.UUIDField(primary_key=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
@@ -0,0 +1,95 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from wagtail.core.models import Page
+from wagtail.core.signals import page_published, page_unpublished, post_page_move
+from wagtail.documents import get_document_model
+from wagtail.images import get_image_model
+
+from core.api import DOCUMENTS_GENERATION, IMAGES_GENERATION, PAGES_GENERATION
+from core.home.models import FORM_GENERATION, ChangeLog, CurrentTransactionId, FormPage
+from core.utils.cache import bump_generation
+
+API_GENERATIONS = {
+    get_image_model(): IMAGES_GENERATION,
+    get_document_model(): DOCUMENTS_GENERATION,
+}
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_page_move)
+def invalidate_api_pages(sender, **kwargs):
+    # wagtail unpublishes the live pages it deletes
+    transaction.on_commit(partial(bump_generation, PAGES_GENERATION))
+
+
+@receiver(post_save)
+def invalidate_api_created_pages(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and isinstance(instance, Page) and instance.live:
+        invalidate_api_pages(sender)
+
+
+@receiver(post_save, sender=get_image_model())
+@receiver(post_delete, sender=get_image_model())
+@receiver(post_save, sender=get_document_model())
+@receiver(post_delete, sender=get_document_model())
+def invalidate_api_media(sender, **kwargs):
+    transaction.on_commit(partial(bump_generation, API_GENERATIONS[sender]))
+
+
+@receiver(page_published, sender=FormPage)
+def invalidate_form_class(sender, instance, **kwargs):
+    transaction.on_commit(partial(bump_generation, FORM_GENERATION % instance.pk))
+
+
+MEDIA_TYPES = {
+    get_image_model(): ChangeLog.IMAGE,
+    get_document_model(): ChangeLog.DOCUMENT,
+}
+
+
+def log_change(object_type, instance, action):
+    ChangeLog.objects.create(
+        object_type=object_type,
+        object_id=instance.pk,
+        action=action,
+        transaction_id=CurrentTransactionId(),
+    )
+
+
+@receiver(post_save)
+def log_page_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and isinstance(instance, Page):
+        log_change(ChangeLog.PAGE, instance, ChangeLog.CREATED)
+
+
+@receiver(page_published)
+def log_page_published(sender, instance, **kwargs):
+    log_change(ChangeLog.PAGE, instance, ChangeLog.PUBLISHED)
+
+
+@receiver(page_unpublished)
+def log_page_unpublished(sender, instance, **kwargs):
+    log_change(ChangeLog.PAGE, instance, ChangeLog.UNPUBLISHED)
+
+
+@receiver(post_delete, sender=Page)
+def log_page_deleted(sender, instance, **kwargs):
+    log_change(ChangeLog.PAGE, instance, ChangeLog.DELETED)
+
+
+@receiver(post_save, sender=get_image_model())
+@receiver(post_save, sender=get_document_model())
+def log_media_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        action = ChangeLog.CREATED if created else ChangeLog.UPDATED
+        log_change(MEDIA_TYPES[sender], instance, action)
+
+
+@receiver(post_delete, sender=get_image_model())
+@receiver(post_delete, sender=get_document_model())
+def log_media_deleted(sender, instance, **kwargs):
+    log_change(MEDIA_TYPES[sender], instance, ChangeLog.DELETED)
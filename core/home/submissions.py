@@ -0,0 +1,210 @@
+"""
+Write-behind buffering of form submissions.
+
+With ``FORM_SUBMISSIONS_WRITE_BEHIND`` on, ``FormPage`` pushes each valid
+submission to a Redis list instead of inserting it in the request, and
+``drain_submissions`` (run by the ``core.home.tasks.drain_form_submissions``
+periodic task) writes them in batches with ``bulk_create``, so that a burst
+of POSTs becomes a steady trickle of bulk INSERTs.
+
+Every buffered submission carries an idempotency key. A batch is moved to a
+processing list before being written and removed from it only after its
+transaction commits, so a drain interrupted at any point writes the batch
+again on the next run; the keys, recorded in ``SubmissionReceipt`` in the
+same transaction, make that replay skip what was already written.
+
+Submissions to pages deleted since they were buffered are dropped. Entries
+that can't be read, and a batch that still fails after
+``FORM_SUBMISSIONS_MAX_ATTEMPTS`` drains, are moved to a dead-letter list,
+so that they don't block the submissions queued behind them.
+"""
+import datetime
+import json
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from redis.exceptions import RedisError
+from wagtail.contrib.forms.models import FormSubmission
+from wagtail.core.models import Page
+
+from core.utils.cache import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "forms:submissions"
+PROCESSING_KEY = "forms:submissions:processing"
+ATTEMPTS_KEY = "forms:submissions:processing:attempts"
+DEAD_LETTER_KEY = "forms:submissions:dead"
+
+
+def buffer_submission(page, form):
+    """
+    Queue the submission of ``form`` to ``page`` and return it unsaved.
+
+    When the default cache is not Redis, or Redis is unavailable, the
+    submission is saved right away.
+    """
+    submission = page.get_submission_class()(
+        page=page,
+        form_data=json.dumps(form.cleaned_data, cls=DjangoJSONEncoder),
+        submit_time=timezone.now(),
+    )
+    conn = get_redis_connection()
+    if conn is not None:
+        entry = {
+            "key": uuid.uuid4().hex,
+            "page_id": page.pk,
+            "form_data": submission.form_data,
+            "submit_time": submission.submit_time.isoformat(),
+        }
+        try:
+            conn.lpush(QUEUE_KEY, json.dumps(entry))
+            return submission
+        except RedisError as e:
+            logger.warning("Unable to buffer form submission in redis: %s", e)
+
+    submission.save()
+    return submission
+
+
+def apply_submissions(entries):
+    """
+    Write the buffered ``entries`` not written yet, in one transaction.
+
+    Returns the number of submissions created.
+    """
+    # imported here, core.home.models uses this module
+    from core.home.models import SubmissionReceipt
+
+    entries = {entry["key"]: entry for entry in entries}
+    page_ids = {entry["page_id"] for entry in entries.values()}
+    deleted = page_ids - set(
+        Page.objects.filter(id__in=page_ids).values_list("id", flat=True)
+    )
+    if deleted:
+        logger.warning(
+            "Dropping the buffered submissions to the deleted pages %s",
+            sorted(deleted),
+        )
+        entries = {
+            key: entry
+            for key, entry in entries.items()
+            if entry["page_id"] not in deleted
+        }
+
+    with transaction.atomic():
+        written = set(
+            SubmissionReceipt.objects.filter(key__in=entries).values_list(
+                "key", flat=True
+            )
+        )
+        entries = [
+            entry for key, entry in entries.items() if uuid.UUID(key) not in written
+        ]
+        if not entries:
+            return 0
+
+        SubmissionReceipt.objects.bulk_create(
+            [SubmissionReceipt(key=entry["key"]) for entry in entries]
+        )
+        submissions = FormSubmission.objects.bulk_create(
+            [
+                FormSubmission(page_id=entry["page_id"], form_data=entry["form_data"])
+                for entry in entries
+            ]
+        )
+        # submit_time is auto_now_add, restore the time of each submission
+        FormSubmission.objects.filter(
+            id__in=[submission.id for submission in submissions]
+        ).update(
+            submit_time=Case(
+                *[
+                    When(
+                        id=submission.id,
+                        then=Value(
+                            datetime.datetime.fromisoformat(entry["submit_time"])
+                        ),
+                    )
+                    for submission, entry in zip(submissions, entries)
+                ],
+                output_field=DateTimeField(),
+            )
+        )
+    return len(entries)
+
+
+def load_entry(data):
+    """Return the buffered entry ``data``, raising ValueError if malformed."""
+    try:
+        entry = json.loads(data)
+        uuid.UUID(entry["key"])
+        datetime.datetime.fromisoformat(entry["submit_time"])
+        entry["page_id"] = int(entry["page_id"])
+        json.loads(entry["form_data"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("Malformed buffered submission %r: %s" % (data, e))
+    return entry
+
+
+def drain_submissions():
+    """
+    Write the buffered submissions to the database, in batches of
+    ``FORM_SUBMISSIONS_BATCH_SIZE``.
+
+    Returns the number of submissions created.
+    """
+    conn = get_redis_connection()
+    if conn is None:
+        return 0
+
+    total = 0
+    while True:
+        # a batch left behind by an interrupted drain goes first
+        batch = conn.lrange(PROCESSING_KEY, 0, -1)
+        if not batch:
+            pipe = conn.pipeline(transaction=False)
+            for __ in range(settings.FORM_SUBMISSIONS_BATCH_SIZE):
+                pipe.rpoplpush(QUEUE_KEY, PROCESSING_KEY)
+            batch = [entry for entry in pipe.execute() if entry is not None]
+        if not batch:
+            return total
+
+        entries = []
+        malformed = []
+        for data in batch:
+            try:
+                entries.append(load_entry(data))
+            except ValueError as e:
+                logger.error("%s", e)
+                malformed.append(data)
+        try:
+            total += apply_submissions(entries)
+        except Exception:
+            if conn.incr(ATTEMPTS_KEY) < settings.FORM_SUBMISSIONS_MAX_ATTEMPTS:
+                raise
+            logger.exception(
+                "Moving a batch of %s buffered submissions to %s",
+                len(batch),
+                DEAD_LETTER_KEY,
+            )
+            malformed = batch
+        pipe = conn.pipeline()
+        if malformed:
+            pipe.lpush(DEAD_LETTER_KEY, *malformed)
+        pipe.delete(PROCESSING_KEY, ATTEMPTS_KEY)
+        pipe.execute()
+
+
+def prune_receipts():
+    """Delete the idempotency keys too old to be replayed."""
+    from core.home.models import SubmissionReceipt
+
+    timeout = datetime.timedelta(seconds=settings.FORM_SUBMISSIONS_RECEIPT_TIMEOUT)
+    return SubmissionReceipt.objects.filter(
+        created_at__lt=timezone.now() - timeout
+    ).delete()[0]
@@ -0,0 +1,81 @@
+import datetime
+import io
+import tempfile
+from smtplib import SMTPException
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.urls import reverse
+from django.utils import timezone
+from wagtail.admin.mail import send_mail
+from wagtail.core.models import Page
+
+from config import celery_app
+from core.home.exports import (
+    get_export_name,
+    get_exports_storage,
+    prune_exports,
+    write_csv,
+)
+from core.home.submissions import drain_submissions, prune_receipts
+from core.utils.tasks import UniqueTask
+
+User = get_user_model()
+
+
+@celery_app.task(
+    autoretry_for=(SMTPException, OSError), retry_backoff=True, max_retries=5
+)
+def send_form_submission_mail(subject, message, recipient_list, from_email):
+    """Send the email notification of a form submission (see FormPage.send_mail)."""
+    return send_mail(subject, message, recipient_list, from_email)
+
+
+@celery_app.task(base=UniqueTask)
+def export_form_submissions(page_id, user_id):
+    """Write the submissions of a form page to a CSV file and email its link."""
+    page = Page.objects.get(pk=page_id).specific
+    user = User.objects.get(pk=user_id)
+
+    with tempfile.TemporaryFile() as fp:
+        text = io.TextIOWrapper(fp, encoding="utf-8", newline="")
+        write_csv(page, text)
+        text.flush()
+        fp.seek(0)
+        name = get_exports_storage().save(get_export_name(page), File(fp))
+        text.detach()
+
+    url = settings.BASE_URL + reverse(
+        "home_download_form_submissions", args=[page.pk, name]
+    )
+    send_mail(
+        "Submissions of %s" % page.title,
+        "The export of the submissions of %s is ready: %s" % (page.title, url),
+        [user.email],
+    )
+    return name
+
+
+@celery_app.task(base=UniqueTask)
+def delete_expired_exports():
+    """Delete the form submission exports older than FORM_EXPORT_EXPIRY."""
+    return prune_exports()
+
+
+@celery_app.task(base=UniqueTask)
+def drain_form_submissions():
+    """Write the form submissions buffered in Redis to the database."""
+    created = drain_submissions()
+    prune_receipts()
+    return created
+
+
+@celery_app.task(base=UniqueTask)
+def prune_change_log():
+    """Delete the changes older than API_CHANGES_RETENTION days."""
+    from core.home.models import ChangeLog
+
+    retention = datetime.timedelta(days=settings.API_CHANGES_RETENTION)
+    expired = ChangeLog.objects.filter(created_at__lt=timezone.now() - retention)
+    return expired.delete()[0]
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+from django.core.management import call_command
+
+from core.home.models import FormPage, HomePage
+from core.utils.benchmark import compare, percentile
+
+pytestmark = pytest.mark.django_db
+
+
+def test_percentile():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([7], 95) == 7
+
+
+def test_compare_reports_regressions_over_tolerance():
+    baseline = {"search": {"p50_ms": 10.0, "queries_mean": 4}}
+    current = {"search": {"p50_ms": 15.0, "queries_mean": 4}}
+
+    assert compare(baseline, current, 0.2) == [("search", "p50_ms", 10.0, 15.0)]
+    assert compare(baseline, current, 0.6) == []
+
+
+def test_benchmark_command_writes_results_and_rolls_back(tmp_path, home_page: HomePage):
+    output = tmp_path / "baseline.json"
+    page_count = HomePage.objects.count()
+
+    call_command("benchmark", pages=1, repeat=1, output=str(output))
+
+    results = json.loads(output.read_text())["results"]
+    assert set(results) == {"search", "api_pages", "page_serving"}
+    assert results["page_serving"]["requests"] == 8
+    assert HomePage.objects.count() == page_count
+    assert not FormPage.objects.exists()
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+import os
+import time
+
+import pytest
+from django.core import mail
+from django.urls import reverse
+from wagtail.contrib.forms.models import FormSubmission
+
+from core.home.exports import get_exports_storage, write_csv
+from core.home.models import FormField, FormPage, HomePage
+from core.home.tasks import delete_expired_exports
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def form_page(home_page: HomePage) -> FormPage:
+    page = home_page.add_child(instance=FormPage(title="Contact"))
+    FormField.objects.create(page=page, label="Name", field_type="singleline")
+    FormField.objects.create(
+        page=page,
+        label="Topics",
+        field_type="checkboxes",
+        choices="Open access,Peer review",
+    )
+    for name in ["Ana", "Bruno", "Carla"]:
+        FormSubmission.objects.create(
+            page=page,
+            form_data=json.dumps(
+                {"name": name, "topics": ["Open access", "Peer review"]}
+            ),
+        )
+    return page
+
+
+def read_csv(content):
+    return list(csv.reader(io.StringIO(content)))
+
+
+def test_write_csv(form_page: FormPage, settings):
+    settings.FORM_EXPORT_CHUNK_SIZE = 2
+    fp = io.StringIO()
+
+    write_csv(form_page, fp)
+
+    rows = read_csv(fp.getvalue())
+    assert rows[0][1:] == ["Name", "Topics"]
+    assert [row[1:] for row in rows[1:]] == [
+        [name, "Open access, Peer review"] for name in ["Ana", "Bruno", "Carla"]
+    ]
+
+
+def test_small_export_is_streamed(admin_client, form_page: FormPage):
+    response = admin_client.get(
+        reverse("home_export_form_submissions", args=[form_page.pk])
+    )
+
+    assert response.status_code == 200
+    assert response.streaming
+    rows = read_csv(b"".join(response.streaming_content).decode())
+    assert len(rows) == 4
+
+
+def test_large_export_runs_in_a_task(
+    admin_client,
+    admin_user,
+    form_page: FormPage,
+    settings,
+    django_capture_on_commit_callbacks,
+):
+    settings.FORM_EXPORT_STREAM_LIMIT = 2
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = admin_client.get(
+            reverse("home_export_form_submissions", args=[form_page.pk])
+        )
+
+    assert response.status_code == 302
+    assert len(mail.outbox) == 1
+    assert mail.outbox[0].to == [admin_user.email]
+    url = mail.outbox[0].body.split(": ")[-1].replace(settings.BASE_URL, "")
+    # stored privately, under a name that can't be guessed
+    (name,) = get_exports_storage().listdir("")[1]
+    assert len(name) > 40
+    assert not os.listdir(settings.MEDIA_ROOT)
+    download = admin_client.get(url)
+    assert download.status_code == 200
+    assert len(read_csv(b"".join(download.streaming_content).decode())) == 4
+
+
+def test_download_checks_the_page(admin_client, form_page: FormPage, home_page):
+    get_exports_storage().save("%s-1.csv" % form_page.pk, io.BytesIO(b""))
+
+    url = reverse(
+        "home_download_form_submissions", args=[home_page.pk, "%s-1.csv" % form_page.pk]
+    )
+    assert admin_client.get(url).status_code == 404
+
+
+def test_delete_expired_exports(form_page: FormPage, settings):
+    storage = get_exports_storage()
+    expired = storage.save("%s-1.csv" % form_page.pk, io.BytesIO(b""))
+    current = storage.save("%s-2.csv" % form_page.pk, io.BytesIO(b""))
+    mtime = time.time() - settings.FORM_EXPORT_EXPIRY - 60
+    os.utime(storage.path(expired), (mtime, mtime))
+
+    assert delete_expired_exports.apply().get() == 1
+
+    assert storage.listdir("")[1] == [current]
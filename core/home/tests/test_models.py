@@ -0,0 +1,72 @@
+import pytest
+from django.core import mail
+from wagtail.contrib.forms.models import FormSubmission
+
+from core.home.models import FormField, FormPage, HomePage
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def form_page(home_page: HomePage) -> FormPage:
+    page = home_page.add_child(
+        instance=FormPage(
+            title="Contact",
+            to_address="editors@example.com",
+            from_address="site@example.com",
+            subject="New contact",
+        )
+    )
+    FormField.objects.create(page=page, label="Name", field_type="singleline")
+    return page
+
+
+def test_submission_mail_is_sent_after_commit(
+    form_page: FormPage, settings, django_capture_on_commit_callbacks
+):
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    form = form_page.get_form(page=form_page, user=None)
+    form.cleaned_data = {"name": "Ana"}
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        form_page.process_form_submission(form)
+
+    assert FormSubmission.objects.filter(page=form_page).count() == 1
+    assert mail.outbox == []
+
+    for callback in callbacks:
+        callback()
+
+    assert len(mail.outbox) == 1
+    assert mail.outbox[0].subject == "New contact"
+    assert mail.outbox[0].to == ["editors@example.com"]
+    assert mail.outbox[0].body == "Name: Ana"
+
+
+def test_form_class_is_cached_until_published(
+    form_page: FormPage, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    form_class = form_page.get_form_class()
+
+    with django_assert_num_queries(0):
+        assert form_page.get_form_class() is form_class
+
+    FormField.objects.create(page=form_page, label="Email", field_type="email")
+    with django_capture_on_commit_callbacks(execute=True):
+        form_page.save_revision().publish()
+    form_page = FormPage.objects.get(pk=form_page.pk)
+
+    new_form_class = form_page.get_form_class()
+    assert new_form_class is not form_class
+    assert list(new_form_class.base_fields) == ["name", "email", "wagtailcaptcha"]
+
+
+def test_preview_form_class_is_not_cached(form_page: FormPage):
+    form_class = form_page.get_form_class()
+    preview = form_page.save_revision().as_page_object()
+    preview.form_fields.add(
+        FormField(label="Email", field_type="email", clean_name="email")
+    )
+
+    assert "email" in preview.get_form_class().base_fields
+    assert form_page.get_form_class() is form_class
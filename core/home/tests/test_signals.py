@@ -0,0 +1,64 @@
+import datetime
+
+import pytest
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from wagtail.documents import get_document_model
+
+from core.home.models import ChangeLog, HomePage
+from core.home.tasks import prune_change_log
+
+pytestmark = pytest.mark.django_db
+
+
+def logged():
+    return list(
+        ChangeLog.objects.order_by("id").values_list(
+            "object_type", "object_id", "action"
+        )
+    )
+
+
+def test_page_changes_are_logged(home_page: HomePage):
+    page = home_page.add_child(instance=HomePage(title="News", live=False))
+    page.save_revision().publish()
+    page.unpublish()
+    page_id = page.id
+    page.delete()
+
+    assert logged() == [
+        ("page", page_id, "created"),
+        ("page", page_id, "published"),
+        ("page", page_id, "unpublished"),
+        ("page", page_id, "deleted"),
+    ]
+
+
+def test_document_changes_are_logged():
+    document = get_document_model().objects.create(
+        title="Report", file=ContentFile(b"report", name="report.txt")
+    )
+    document.title = "Annual report"
+    document.save()
+    document_id = document.id
+    document.delete()
+
+    assert logged() == [
+        ("document", document_id, "created"),
+        ("document", document_id, "updated"),
+        ("document", document_id, "deleted"),
+    ]
+
+
+def test_old_changes_are_pruned(home_page: HomePage, settings):
+    settings.API_CHANGES_RETENTION = 30
+    home_page.add_child(instance=HomePage(title="News"))
+    home_page.add_child(instance=HomePage(title="Events"))
+    old, recent = ChangeLog.objects.order_by("id")
+    ChangeLog.objects.filter(pk=old.pk).update(
+        created_at=timezone.now() - datetime.timedelta(days=31)
+    )
+
+    assert prune_change_log.apply().get() == 1
+
+    assert list(ChangeLog.objects.all()) == [recent]
@@ -0,0 +1,166 @@
+import datetime
+import json
+import uuid
+from collections import defaultdict
+from unittest.mock import Mock
+
+import pytest
+from django.db import IntegrityError
+from django.utils import timezone
+from wagtail.contrib.forms.models import FormSubmission
+
+from core.home import submissions
+from core.home.models import FormField, FormPage, HomePage
+from core.home.submissions import apply_submissions, drain_submissions
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def form_page(home_page: HomePage) -> FormPage:
+    page = home_page.add_child(instance=FormPage(title="Call for papers"))
+    FormField.objects.create(page=page, label="Name", field_type="singleline")
+    return page
+
+
+def get_entry(page, name, submit_time):
+    return {
+        "key": uuid.uuid4().hex,
+        "page_id": page.pk,
+        "form_data": json.dumps({"name": name}),
+        "submit_time": submit_time.isoformat(),
+    }
+
+
+def test_apply_submissions_is_idempotent(form_page: FormPage):
+    submit_time = timezone.now() - datetime.timedelta(minutes=5)
+    entries = [get_entry(form_page, name, submit_time) for name in ["Ana", "Bruno"]]
+
+    assert apply_submissions(entries) == 2
+    assert (
+        apply_submissions(entries + [get_entry(form_page, "Carla", submit_time)]) == 1
+    )
+
+    submissions = FormSubmission.objects.filter(page=form_page).order_by("id")
+    assert [s.get_data()["name"] for s in submissions] == ["Ana", "Bruno", "Carla"]
+    assert {s.submit_time for s in submissions} == {submit_time}
+
+
+def test_write_behind_without_redis_saves_in_request(form_page: FormPage, settings):
+    settings.FORM_SUBMISSIONS_WRITE_BEHIND = True
+    form = form_page.get_form(page=form_page, user=None)
+    form.cleaned_data = {"name": "Ana"}
+
+    submission = form_page.process_form_submission(form)
+
+    assert submission.pk is not None
+    assert FormSubmission.objects.filter(page=form_page).count() == 1
+    assert drain_submissions() == 0
+
+
+class FakeRedis:
+    """The list commands of a redis client used by the write-behind buffer."""
+
+    def __init__(self):
+        self.lists = defaultdict(list)
+        self.counters = defaultdict(int)
+
+    def lpush(self, key, *values):
+        for value in values:
+            if isinstance(value, str):
+                value = value.encode()
+            self.lists[key].insert(0, value)
+
+    def lrange(self, key, start, end):
+        return list(self.lists[key])
+
+    def rpoplpush(self, source, destination):
+        if not self.lists[source]:
+            return None
+        value = self.lists[source].pop()
+        self.lists[destination].insert(0, value)
+        return value
+
+    def incr(self, key):
+        self.counters[key] += 1
+        return self.counters[key]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.lists.pop(key, None)
+            self.counters.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, conn):
+        self.conn = conn
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.commands.append((name, args))
+
+    def execute(self):
+        return [getattr(self.conn, name)(*args) for name, args in self.commands]
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    conn = FakeRedis()
+    monkeypatch.setattr(submissions, "get_redis_connection", lambda: conn)
+    return conn
+
+
+def test_buffered_submissions_are_drained_in_batches(
+    form_page: FormPage, redis, settings
+):
+    settings.FORM_SUBMISSIONS_BATCH_SIZE = 2
+    form = form_page.get_form(page=form_page, user=None)
+    for name in ["Ana", "Bruno", "Carla"]:
+        form.cleaned_data = {"name": name}
+        submissions.buffer_submission(form_page, form)
+
+    assert FormSubmission.objects.filter(page=form_page).count() == 0
+    assert drain_submissions() == 3
+
+    saved = FormSubmission.objects.filter(page=form_page).order_by("id")
+    assert [s.get_data()["name"] for s in saved] == ["Ana", "Bruno", "Carla"]
+    assert not redis.lists[submissions.QUEUE_KEY]
+    assert not redis.lists[submissions.PROCESSING_KEY]
+
+
+def test_drain_skips_deleted_pages_and_malformed_entries(
+    form_page: FormPage, home_page: HomePage, redis
+):
+    deleted = home_page.add_child(instance=FormPage(title="Old call"))
+    now = timezone.now()
+    redis.lpush(submissions.QUEUE_KEY, json.dumps(get_entry(deleted, "Ana", now)))
+    deleted.delete()
+    redis.lpush(submissions.QUEUE_KEY, "not json")
+    redis.lpush(submissions.QUEUE_KEY, json.dumps(get_entry(form_page, "Bruno", now)))
+
+    assert drain_submissions() == 1
+
+    assert FormSubmission.objects.get().get_data()["name"] == "Bruno"
+    assert redis.lists[submissions.DEAD_LETTER_KEY] == [b"not json"]
+
+
+def test_failing_batch_is_moved_to_the_dead_letter_list(
+    form_page: FormPage, redis, settings, monkeypatch
+):
+    settings.FORM_SUBMISSIONS_MAX_ATTEMPTS = 2
+    entry = json.dumps(get_entry(form_page, "Ana", timezone.now()))
+    redis.lpush(submissions.QUEUE_KEY, entry)
+    monkeypatch.setattr(
+        submissions, "apply_submissions", Mock(side_effect=IntegrityError)
+    )
+
+    with pytest.raises(IntegrityError):
+        drain_submissions()
+    assert redis.lists[submissions.PROCESSING_KEY] == [entry.encode()]
+
+    assert drain_submissions() == 0
+    assert redis.lists[submissions.DEAD_LETTER_KEY] == [entry.encode()]
+    assert not redis.lists[submissions.PROCESSING_KEY]
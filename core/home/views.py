@@ -0,0 +1,55 @@
+from functools import partial
+
+from django.conf import settings
+from django.contrib import messages
+from django.db import transaction
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.utils.translation import gettext as _
+from wagtail.contrib.forms.utils import get_forms_for_user
+
+from core.home.exports import get_export_filename, get_exports_storage, iter_csv
+from core.home.tasks import export_form_submissions
+
+
+def export_submissions(request, page_id):
+    """
+    Stream the submissions of a form page as CSV, or export them in a
+    Celery task when there are more than FORM_EXPORT_STREAM_LIMIT.
+    """
+    page = get_object_or_404(get_forms_for_user(request.user), pk=page_id).specific
+    count = page.get_submission_class().objects.filter(page=page).count()
+
+    if count <= settings.FORM_EXPORT_STREAM_LIMIT:
+        response = StreamingHttpResponse(
+            iter_csv(page), content_type="text/csv; charset=utf-8"
+        )
+        response["Content-Disposition"] = 'attachment; filename="%s"' % (
+            get_export_filename(page)
+        )
+        return response
+
+    transaction.on_commit(
+        partial(export_form_submissions.delay, page.pk, request.user.pk)
+    )
+    messages.success(
+        request,
+        _(
+            "The export of %(count)s submissions has started, "
+            "a download link will be emailed to you."
+        )
+        % {"count": count},
+    )
+    return redirect("wagtailforms:list_submissions", page.pk)
+
+
+def download_export(request, page_id, filename):
+    page = get_object_or_404(get_forms_for_user(request.user), pk=page_id)
+    storage = get_exports_storage()
+    if not filename.startswith("%s-" % page.pk) or not storage.exists(filename):
+        raise Http404
+    return FileResponse(
+        storage.open(filename),
+        as_attachment=True,
+        filename=get_export_filename(page),
+    )
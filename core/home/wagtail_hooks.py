@@ -0,0 +1,34 @@
+from django.urls import path, reverse
+from django.utils.translation import gettext_lazy as _
+from wagtail.admin.widgets import Button
+from wagtail.contrib.forms.models import AbstractForm
+from wagtail.core import hooks
+
+from core.home import views
+
+
+@hooks.register("register_admin_urls")
+def register_admin_urls():
+    return [
+        path(
+            "form-submissions/<int:page_id>/export/",
+            views.export_submissions,
+            name="home_export_form_submissions",
+        ),
+        path(
+            "form-submissions/<int:page_id>/exports/<str:filename>",
+            views.download_export,
+            name="home_download_form_submissions",
+        ),
+    ]
+
+
+@hooks.register("register_page_listing_more_buttons")
+def page_listing_more_buttons(page, page_perms, is_parent=False, next_url=None):
+    form_page = page.specific_class and issubclass(page.specific_class, AbstractForm)
+    if form_page and page_perms.can_edit():
+        yield Button(
+            _("Export submissions"),
+            reverse("home_export_form_submissions", args=[page.id]),
+            priority=60,
+        )
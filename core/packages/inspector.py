@@ -0,0 +1,138 @@
+"""
+Inspection of SPS zip packages without extracting them.
+
+The members, sizes and CRCs come from the zip central directory, read from
+the end of the file, and only the XML members are decompressed, streamed
+through an incremental parser that only keeps the elements still open in
+memory.
+Inspecting a package therefore reads its directory and its XML, however
+large the images and PDFs it carries are.
+"""
+import posixpath
+import zipfile
+from urllib.parse import urlparse
+
+from defusedxml.ElementTree import ParseError, iterparse
+
+XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+# elements whose xlink:href points outside of the package
+EXTERNAL_TAGS = {"ext-link", "uri", "self-uri", "related-article", "license"}
+
+
+def get_members(zf):
+    """Return the name, sizes and CRC of the files of the zip ``zf``."""
+    return [
+        {
+            "name": info.filename,
+            "size": info.file_size,
+            "compressed_size": info.compress_size,
+            "crc": "%08x" % info.CRC,
+        }
+        for info in zf.infolist()
+        if not info.is_dir()
+    ]
+
+
+def is_external(href):
+    return not href or href.startswith("#") or bool(urlparse(href).scheme)
+
+
+def iter_hrefs(fp):
+    """Yield the ``xlink:href`` of the elements of the XML read from ``fp``."""
+    ancestors = []
+    for event, element in iterparse(fp, events=("start", "end")):
+        if event == "start":
+            ancestors.append(element)
+            continue
+        ancestors.pop()
+        href = element.get(XLINK_HREF)
+        tag = element.tag.rpartition("}")[2]
+        if href is not None and tag not in EXTERNAL_TAGS:
+            yield href.strip()
+        # the parsed elements are not needed anymore; cleared, they would
+        # still be children of their parent, the tree growing with the XML
+        element.clear()
+        if ancestors:
+            ancestors[-1].remove(element)
+
+
+class MemberIndex:
+    """Names of the members of a package, matched by path or by stem."""
+
+    def __init__(self, names):
+        self.names = set(names)
+        # SPS allows images referenced without their extension
+        self.stems = {}
+        for name in sorted(self.names):
+            self.stems.setdefault(posixpath.splitext(name)[0], []).append(name)
+
+    def find(self, path):
+        """Return the names of the members ``path`` refers to."""
+        if path in self.names:
+            return [path]
+        return self.stems.get(path, [])
+
+
+def resolve_href(xml_name, href):
+    """Return the member path of ``href`` relative to the XML ``xml_name``."""
+    return posixpath.normpath(posixpath.join(posixpath.dirname(xml_name), href))
+
+
+def inspect_package(file):
+    """
+    Return a JSON serializable report of the zip package ``file``, a path
+    or a binary file object: its members, its XML files, the references of
+    each XML missing from the package and the XML that couldn't be read.
+
+    ``references`` holds the members each XML refers to, which have to be
+    processed again with it when they change.
+    """
+    report = {
+        "members": [],
+        "xml": [],
+        "references": {},
+        "missing": {},
+        "errors": {},
+    }
+    try:
+        zf = zipfile.ZipFile(file)
+    except (zipfile.BadZipFile, OSError) as e:
+        report["errors"][""] = "Not a zip file: %s" % e
+        report["valid"] = False
+        return report
+
+    with zf:
+        report["members"] = get_members(zf)
+        members = MemberIndex(member["name"] for member in report["members"])
+        report["xml"] = sorted(
+            name for name in members.names if name.lower().endswith(".xml")
+        )
+        for xml_name in report["xml"]:
+            references = set()
+            missing = []
+            try:
+                with zf.open(xml_name) as fp:
+                    for href in iter_hrefs(fp):
+                        if is_external(href):
+                            continue
+                        found = members.find(resolve_href(xml_name, href))
+                        if not found:
+                            missing.append(href)
+                        references.update(found)
+            except (
+                ParseError,
+                zipfile.BadZipFile,
+                RuntimeError,
+                NotImplementedError,
+                # defusedxml's forbidden entities
+                ValueError,
+            ) as e:
+                report["errors"][xml_name] = str(e)
+            report["references"][xml_name] = sorted(references)
+            if missing:
+                report["missing"][xml_name] = sorted(set(missing))
+
+    report["valid"] = bool(report["xml"]) and not (
+        report["missing"] or report["errors"]
+    )
+    return report
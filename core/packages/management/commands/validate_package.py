@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.packages.validation import validate_package
+
+
+class Command(BaseCommand):
+    help = (
+        "Validate the XML files of zip packages against the PACKAGE_XML_* rules, "
+        "in parallel processes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Zip packages to validate")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of processes validating files at the same time",
+        )
+        parser.add_argument("--output", help="Write the errors to this JSON file")
+
+    def handle(self, paths, workers, output, **options):
+        results = {}
+        invalid = 0
+        for path in paths:
+            results[path] = validate_package(path, workers=workers)
+            for result in results[path]:
+                for error in result["errors"]:
+                    self.stdout.write(
+                        "%s:%s:%s: [%s] %s"
+                        % (
+                            path,
+                            result["file"],
+                            error["line"],
+                            error["kind"],
+                            error["message"],
+                        )
+                    )
+                invalid += bool(result["errors"])
+
+        if output:
+            with open(output, "w") as fp:
+                json.dump(results, fp, indent=2)
+        if invalid:
+            raise CommandError("%d XML files are invalid" % invalid)
+        self.stdout.write(self.style.SUCCESS("Every XML file is valid"))
@@ -0,0 +1,55 @@
+"""
+Changes between two submissions of the same package.
+
+The manifest of a package is the size and CRC-32 of each member, read from
+the zip central directory by ``core.packages.inspector``, so it costs no
+extraction. Comparing the manifest of a resubmitted package with the one
+of its previous submission tells which members changed, and the references
+of the XML files tell which articles have to be processed again because an
+image or PDF they use changed.
+"""
+
+
+def get_manifest(inspection):
+    """Return ``{name: (size, crc)}`` for the members of an inspection."""
+    return {
+        member["name"]: (member["size"], member["crc"])
+        for member in inspection["members"]
+    }
+
+
+def get_dependents(inspection, names):
+    """Return the XML files of ``inspection`` referring to any of ``names``."""
+    names = set(names)
+    return {
+        xml_name
+        for xml_name, references in inspection.get("references", {}).items()
+        if names.intersection(references)
+    }
+
+
+def diff_inspections(previous, current):
+    """
+    Return the members ``added``, ``changed`` and ``removed`` from the
+    ``previous`` inspection of a package to its ``current`` one, and the
+    XML files of ``current`` to process again: the new or changed ones and
+    those referring to a member that changed.
+    """
+    before = get_manifest(previous)
+    after = get_manifest(current)
+    added = sorted(set(after) - set(before))
+    removed = sorted(set(before) - set(after))
+    changed = sorted(
+        name for name in set(after) & set(before) if after[name] != before[name]
+    )
+
+    touched = set(added) | set(changed) | set(removed)
+    xml = {name for name in current["xml"] if name in touched}
+    # a removed member is still referred to by the XML that used to find it
+    xml |= get_dependents(current, touched) | get_dependents(previous, removed)
+    return {
+        "added": added,
+        "changed": changed,
+        "removed": removed,
+        "xml": sorted(xml & set(current["xml"])),
+    }
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.12 on 2026-10-17 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0002_upload_inspection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='validation',
+            field=models.JSONField(blank=True, null=True, verbose_name='validation'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.12 on 2026-10-17 06:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0003_upload_validation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='changes',
+            field=models.JSONField(blank=True, null=True, verbose_name='changes'),
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='previous',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='packages.upload'),
+        ),
+    ]
@@ -0,0 +1,90 @@
+import datetime
+import os
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from wagtail.documents import get_document_model_string
+
+
+def get_uploads_root():
+    """Directory of the partial uploads, next to MEDIA_ROOT by default."""
+    return settings.PACKAGE_UPLOADS_ROOT or os.path.join(
+        settings.MEDIA_ROOT, "partial-uploads"
+    )
+
+
+class Upload(models.Model):
+    """
+    A package uploaded in chunks (see ``core.packages.uploads``), whose
+    first ``offset`` bytes are written to ``path``. The package is inspected
+    and its document created once all of its ``size`` bytes are received.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(_("filename"), max_length=255)
+    size = models.PositiveBigIntegerField(_("size"))
+    offset = models.PositiveBigIntegerField(_("offset"), default=0)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    document = models.ForeignKey(
+        get_document_model_string(),
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    # report of core.packages.inspector, once complete
+    inspection = models.JSONField(_("inspection"), null=True, blank=True)
+    # errors of each XML file found by core.packages.validation
+    validation = models.JSONField(_("validation"), null=True, blank=True)
+    # the last submission of the same package and the members changed since
+    # (see core.packages.manifests)
+    previous = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    changes = models.JSONField(_("changes"), null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return "%s (%s/%s)" % (self.filename, self.offset, self.size)
+
+    @property
+    def path(self):
+        return os.path.join(get_uploads_root(), str(self.id))
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
+
+    def get_previous_submission(self):
+        """
+        Return the last complete upload of a package of the same name by the
+        same user.
+        """
+        return (
+            Upload.objects.filter(
+                user=self.user, filename=self.filename, document__isnull=False
+            )
+            .exclude(pk=self.pk)
+            .exclude(inspection__isnull=True)
+            .order_by("-created_at")
+            .first()
+        )
+
+    @property
+    def expires_at(self):
+        """When the upload is deleted if no chunk is received until then."""
+        return self.updated_at + datetime.timedelta(
+            seconds=settings.PACKAGE_UPLOAD_EXPIRY
+        )
@@ -0,0 +1,114 @@
+import datetime
+
+from celery import chord
+from celery.signals import worker_process_init
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from config import celery_app
+from core.packages.models import Upload
+from core.packages.uploads import assemble, delete_upload
+from core.packages.validation import get_xml_names, load_validator, validate_member
+from core.utils.tasks import UniqueTask
+
+
+@worker_process_init.connect
+def load_xml_validator(**kwargs):
+    """Compile the XML rules once per worker process, as it starts."""
+    load_validator()
+
+
+@celery_app.task(base=UniqueTask)
+def delete_expired_uploads():
+    """Delete the partial uploads that received no chunk for a while."""
+    expired = timezone.now() - datetime.timedelta(
+        seconds=settings.PACKAGE_UPLOAD_EXPIRY
+    )
+    uploads = Upload.objects.filter(document__isnull=True, updated_at__lt=expired)
+    count = 0
+    for upload in uploads.iterator():
+        delete_upload(upload)
+        count += 1
+    return count
+
+
+@celery_app.task(base=UniqueTask)
+def assemble_upload(upload_id):
+    """
+    Inspect a complete upload and create its document (see
+    ``core.packages.uploads.assemble``), then validate it if it is valid.
+    """
+    with transaction.atomic():
+        upload = (
+            Upload.objects.select_for_update()
+            .filter(pk=upload_id, document__isnull=True)
+            .first()
+        )
+        if upload is None or not upload.is_complete:
+            # assembled already, or deleted
+            return None
+        assemble(upload)
+    if hasattr(default_storage, "deduplicate"):
+        deduplicate_stored_file.delay(upload.document.file.name)
+    if upload.inspection["valid"]:
+        validate_upload.delay(upload_id)
+    return upload.document_id
+
+
+@celery_app.task()
+def validate_xml(path, name):
+    """Validate one XML file of the package at ``path``."""
+    return validate_member(path, name)
+
+
+@celery_app.task()
+def save_validation(results, upload_id, carried=()):
+    results = sorted([*results, *carried], key=lambda result: result["file"])
+    Upload.objects.filter(pk=upload_id).update(validation=results)
+
+
+@celery_app.task(base=UniqueTask)
+def validate_upload(upload_id):
+    """
+    Validate the XML files of an upload in parallel, one task per file.
+
+    The results of the previous submission of the package are kept for the
+    XML files that didn't change, nor any member they refer to.
+    """
+    upload = Upload.objects.select_related("document", "previous").get(pk=upload_id)
+    path = upload.document.file.path
+    names = get_xml_names(path)
+    carried = []
+    previous = upload.previous
+    # the previous upload may have been deleted since
+    if (
+        upload.changes is not None
+        and previous is not None
+        and previous.validation is not None
+    ):
+        results = {result["file"]: result for result in previous.validation}
+        carried = [
+            results[name]
+            for name in names
+            if name in results and name not in upload.changes["xml"]
+        ]
+        unchanged = {result["file"] for result in carried}
+        names = [name for name in names if name not in unchanged]
+    header = [validate_xml.s(path, name) for name in names]
+    return chord(header)(save_validation.s(upload_id, carried)).id
+
+
+@celery_app.task(base=UniqueTask)
+def deduplicate_stored_file(name):
+    """Link a file of the content-addressed storage to the blob of its content."""
+    return default_storage.deduplicate(name)
+
+
+@celery_app.task(base=UniqueTask)
+def collect_storage_garbage():
+    """Delete the blobs of the content-addressed storage no file links to."""
+    if not hasattr(default_storage, "collect_garbage"):
+        return 0, 0
+    return default_storage.collect_garbage()
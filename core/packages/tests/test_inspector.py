@@ -0,0 +1,106 @@
+import io
+import zipfile
+
+from core.packages import inspector
+from core.packages.inspector import inspect_package, iter_hrefs
+
+ARTICLE = """<?xml version="1.0" encoding="utf-8"?>
+<article xmlns:xlink="http://www.w3.org/1999/xlink">
+  <body>
+    <fig><graphic xlink:href="1234-gf01.tif"/></fig>
+    <fig><graphic xlink:href="1234-gf02"/></fig>
+    <p><inline-graphic xlink:href="1234-e01.gif"/></p>
+    <p><ext-link xlink:href="https://scielo.org">SciELO</ext-link></p>
+    <supplementary-material xlink:href="1234-suppl.pdf"/>
+  </body>
+</article>
+"""
+
+
+def make_package(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, content in members.items():
+            zf.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def test_inspect_package_lists_members_and_missing_references():
+    package = make_package(
+        {
+            "1234.xml": ARTICLE,
+            "1234-gf01.tif": b"\x00" * 1000,
+            "1234-gf02.jpg": b"\x00" * 10,
+            "1234-e01.gif": b"GIF89a",
+        }
+    )
+
+    report = inspect_package(package)
+
+    assert report["xml"] == ["1234.xml"]
+    tif = next(m for m in report["members"] if m["name"] == "1234-gf01.tif")
+    assert tif["size"] == 1000
+    assert tif["crc"] == "%08x" % zipfile.crc32(b"\x00" * 1000)
+    assert report["references"] == {
+        "1234.xml": ["1234-e01.gif", "1234-gf01.tif", "1234-gf02.jpg"]
+    }
+    assert report["missing"] == {"1234.xml": ["1234-suppl.pdf"]}
+    assert report["errors"] == {}
+    assert not report["valid"]
+
+
+def test_inspect_package_reads_only_the_xml(monkeypatch):
+    package = make_package(
+        {
+            "article/1234.xml": ARTICLE.replace(
+                '<supplementary-material xlink:href="1234-suppl.pdf"/>', ""
+            ),
+            "article/1234-gf01.tif": b"\x00" * 1000,
+            "article/1234-gf02.tif": b"\x00",
+            "article/1234-e01.gif": b"GIF89a",
+        }
+    )
+    opened = []
+    open_member = zipfile.ZipFile.open
+
+    def record_open(self, name, *args, **kwargs):
+        opened.append(getattr(name, "filename", name))
+        return open_member(self, name, *args, **kwargs)
+
+    monkeypatch.setattr(zipfile.ZipFile, "open", record_open)
+    report = inspect_package(package)
+
+    assert report["valid"]
+    assert opened == ["article/1234.xml"]
+
+
+def test_inspect_package_reports_unreadable_files():
+    assert not inspect_package(io.BytesIO(b"not a zip"))["valid"]
+
+    report = inspect_package(make_package({"1234.xml": "<article><body>"}))
+
+    assert list(report["errors"]) == ["1234.xml"]
+    assert not report["valid"]
+
+
+def test_iter_hrefs_drops_the_parsed_elements(monkeypatch):
+    figures = "".join(
+        '<fig><graphic xlink:href="%s.tif"/></fig>' % number for number in range(5000)
+    )
+    xml = ARTICLE.replace("<body>", "<body>" + figures)
+    left = []
+    iterparse = inspector.iterparse
+
+    def record_body_children(*args, **kwargs):
+        for event, element in iterparse(*args, **kwargs):
+            if event == "end" and element.tag == "body":
+                left.append(len(element))
+            yield event, element
+
+    monkeypatch.setattr(inspector, "iterparse", record_body_children)
+    hrefs = list(iter_hrefs(io.BytesIO(xml.encode())))
+
+    assert len(hrefs) == 5004
+    # the figures were removed from the tree as they were parsed
+    assert left == [0]
@@ -0,0 +1,57 @@
+from core.packages.inspector import inspect_package
+from core.packages.manifests import diff_inspections
+from core.packages.tests.test_inspector import make_package
+
+
+def article(*hrefs):
+    graphics = "".join('<graphic xlink:href="%s"/>' % href for href in hrefs)
+    return (
+        '<article xmlns:xlink="http://www.w3.org/1999/xlink"><body>%s</body></article>'
+        % graphics
+    )
+
+
+MEMBERS = {
+    "a.xml": article("a-gf01"),
+    "a-gf01.tif": b"a1",
+    "b.xml": article("b-gf01.tif", "shared.jpg"),
+    "b-gf01.tif": b"b1",
+    "c.xml": article("shared.jpg"),
+    "shared.jpg": b"s",
+}
+
+
+def diff(changes=None):
+    """Diff ``MEMBERS`` with ``changes`` applied, None deleting a member."""
+    members = dict(MEMBERS)
+    for name, content in (changes or {}).items():
+        if content is None:
+            del members[name]
+        else:
+            members[name] = content
+    return diff_inspections(
+        inspect_package(make_package(MEMBERS)), inspect_package(make_package(members))
+    )
+
+
+def test_unchanged_package_has_nothing_to_process():
+    assert diff() == {"added": [], "changed": [], "removed": [], "xml": []}
+
+
+def test_changed_xml_is_processed_alone():
+    changes = diff({"a.xml": article("a-gf01") + " "})
+
+    assert changes["changed"] == ["a.xml"]
+    assert changes["xml"] == ["a.xml"]
+
+
+def test_changed_asset_marks_the_xml_referring_to_it():
+    assert diff({"a-gf01.tif": b"a2"})["xml"] == ["a.xml"]
+    assert diff({"shared.jpg": b"s2"})["xml"] == ["b.xml", "c.xml"]
+
+
+def test_removed_members_mark_the_xml_that_used_them():
+    changes = diff({"b-gf01.tif": None, "c.xml": None})
+
+    assert changes["removed"] == ["b-gf01.tif", "c.xml"]
+    assert changes["xml"] == ["b.xml"]
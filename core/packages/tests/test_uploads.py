@@ -0,0 +1,217 @@
+import base64
+import datetime
+import hashlib
+import io
+import os
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from core.packages import uploads
+from core.packages.models import Upload
+from core.packages.tasks import assemble_upload, delete_expired_uploads
+
+pytestmark = pytest.mark.django_db
+
+PACKAGE = b"PK\x03\x04" + bytes(range(256)) * 40
+
+
+def encode(value):
+    return base64.b64encode(value).decode()
+
+
+def create_upload(client, size=len(PACKAGE), filename="issue.zip"):
+    return client.post(
+        reverse("packages:upload_list"),
+        HTTP_UPLOAD_LENGTH=str(size),
+        HTTP_UPLOAD_METADATA="filename %s" % encode(filename.encode()),
+    )
+
+
+def send_chunk(client, url, offset, chunk, checksum=None):
+    # also set for an empty chunk, unlike content_type
+    headers = {
+        "CONTENT_LENGTH": str(len(chunk)),
+        "CONTENT_TYPE": "application/offset+octet-stream",
+        "HTTP_UPLOAD_OFFSET": str(offset),
+    }
+    if checksum is not None:
+        headers["HTTP_UPLOAD_CHECKSUM"] = "sha256 %s" % encode(checksum)
+    return client.generic(
+        "PATCH",
+        url,
+        chunk,
+        content_type="application/offset+octet-stream",
+        **headers,
+    )
+
+
+@pytest.fixture(autouse=True)
+def eager_tasks(settings):
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+
+
+def test_upload_in_checksummed_chunks(admin_client, django_capture_on_commit_callbacks):
+    response = create_upload(admin_client)
+    assert response.status_code == 201
+    url = response["Location"]
+    upload = Upload.objects.get()
+    assert os.path.getsize(upload.path) == 0
+
+    first, second = PACKAGE[:4000], PACKAGE[4000:]
+    response = send_chunk(admin_client, url, 0, first, hashlib.sha256(first).digest())
+    assert response.status_code == 204
+    assert response["Upload-Offset"] == "4000"
+    assert admin_client.head(url)["Upload-Offset"] == "4000"
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        response = send_chunk(
+            admin_client, url, 4000, second, hashlib.sha256(second).digest()
+        )
+    assert response.status_code == 204
+    # assembled by a task once the chunk is committed
+    upload.refresh_from_db()
+    assert upload.is_complete
+    assert upload.document is None
+    for callback in callbacks:
+        callback()
+
+    upload.refresh_from_db()
+    assert upload.document.title == "issue.zip"
+    # not a real zip, but inspected before its document was created
+    assert upload.inspection["valid"] is False
+    assert upload.document.file_size == len(PACKAGE)
+    with upload.document.open_file() as fp:
+        assert fp.read() == PACKAGE
+    assert not os.path.exists(upload.path)
+    assert admin_client.get(url).json()["document"] == upload.document.id
+
+
+def test_chunk_is_rejected_at_another_offset(admin_client):
+    url = create_upload(admin_client)["Location"]
+    send_chunk(admin_client, url, 0, PACKAGE[:100])
+
+    response = send_chunk(admin_client, url, 50, PACKAGE[50:100])
+
+    assert response.status_code == 409
+    assert Upload.objects.get().offset == 100
+
+
+def test_chunk_is_rejected_once_another_chunk_is_recorded(admin_client):
+    url = create_upload(admin_client)["Location"]
+    stale = Upload.objects.get()
+    send_chunk(admin_client, url, 0, PACKAGE[:100])
+
+    with pytest.raises(uploads.OffsetError):
+        uploads.write_chunk(stale, io.BytesIO(b"x" * 100), 100)
+
+    upload = Upload.objects.get()
+    assert upload.offset == 100
+    with open(upload.path, "rb") as fp:
+        assert fp.read() == PACKAGE[:100]
+
+
+def test_empty_chunk_of_an_assembled_upload(
+    admin_client, django_capture_on_commit_callbacks
+):
+    url = create_upload(admin_client)["Location"]
+    with django_capture_on_commit_callbacks(execute=True):
+        send_chunk(admin_client, url, 0, PACKAGE)
+    upload = Upload.objects.get()
+    assert upload.document is not None
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        response = send_chunk(admin_client, url, len(PACKAGE), b"")
+
+    assert response.status_code == 204
+    assert response["Upload-Offset"] == str(len(PACKAGE))
+    assert callbacks == []
+
+
+def test_chunk_not_matching_its_checksum_is_discarded(
+    admin_client, django_capture_on_commit_callbacks
+):
+    url = create_upload(admin_client)["Location"]
+    send_chunk(admin_client, url, 0, PACKAGE[:100])
+
+    corrupted = b"x" + PACKAGE[101:200]
+    response = send_chunk(
+        admin_client, url, 100, corrupted, hashlib.sha256(PACKAGE[100:200]).digest()
+    )
+
+    assert response.status_code == 460
+    upload = Upload.objects.get()
+    assert upload.offset == 100
+    with open(upload.path, "rb") as fp:
+        assert fp.read() == PACKAGE[:100]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = send_chunk(admin_client, url, 100, PACKAGE[100:])
+    assert response.status_code == 204
+    upload.refresh_from_db()
+    with upload.document.open_file() as fp:
+        assert fp.read() == PACKAGE
+
+
+def test_upload_requires_the_permission_to_add_documents(client, user):
+    client.force_login(user)
+
+    assert create_upload(client).status_code == 403
+
+
+def test_upload_is_limited_to_max_size(admin_client, settings):
+    settings.PACKAGE_UPLOAD_MAX_SIZE = 10
+
+    assert create_upload(admin_client, size=11).status_code == 413
+
+
+def test_empty_upload_is_rejected(admin_client):
+    assert create_upload(admin_client, size=0).status_code == 400
+    assert not Upload.objects.exists()
+
+
+def test_assemble_upload_is_idempotent(admin_client):
+    url = create_upload(admin_client)["Location"]
+    send_chunk(admin_client, url, 0, PACKAGE)
+    upload = Upload.objects.get()
+
+    document_id = assemble_upload.apply(args=(str(upload.id),)).get()
+
+    assert document_id is not None
+    assert assemble_upload.apply(args=(str(upload.id),)).get() is None
+    upload.refresh_from_db()
+    assert upload.document_id == document_id
+
+
+def test_delete_expired_uploads(admin_client):
+    create_upload(admin_client)
+    create_upload(admin_client)
+    expired, current = Upload.objects.all()
+    Upload.objects.filter(pk=expired.pk).update(
+        updated_at=timezone.now() - datetime.timedelta(days=30)
+    )
+
+    assert delete_expired_uploads.apply().get() == 1
+
+    assert list(Upload.objects.all()) == [current]
+    assert not os.path.exists(expired.path)
+    assert os.path.exists(current.path)
+
+
+def test_previous_submission_is_from_the_same_user(
+    admin_client, client, django_user_model, django_capture_on_commit_callbacks
+):
+    url = create_upload(admin_client)["Location"]
+    with django_capture_on_commit_callbacks(execute=True):
+        send_chunk(admin_client, url, 0, PACKAGE)
+    other = django_user_model.objects.create_superuser("other", "o@example.com", "x")
+    client.force_login(other)
+    url = create_upload(client)["Location"]
+    with django_capture_on_commit_callbacks(execute=True):
+        send_chunk(client, url, 0, PACKAGE)
+
+    upload = Upload.objects.get(user=other)
+    assert upload.document is not None
+    assert upload.previous is None
+    assert upload.get_previous_submission() is None
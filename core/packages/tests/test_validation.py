@@ -0,0 +1,161 @@
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from core.packages import tasks, uploads, validation
+from core.packages.models import Upload
+from core.packages.tasks import validate_upload
+from core.packages.tests.test_inspector import make_package
+
+DTD = """
+<!ELEMENT article (front, body)>
+<!ATTLIST article article-type CDATA #IMPLIED>
+<!ELEMENT front (#PCDATA)>
+<!ELEMENT body (#PCDATA)>
+"""
+
+SCHEMATRON = """<?xml version="1.0" encoding="UTF-8"?>
+<schema xmlns="http://purl.oclc.org/dsdl/schematron">
+  <pattern>
+    <rule context="article">
+      <assert test="@article-type">article-type is required</assert>
+    </rule>
+  </pattern>
+</schema>
+"""
+
+VALID = '<article article-type="research-article"><front/><body/></article>'
+
+
+@pytest.fixture
+def rules(settings, tmp_path):
+    (tmp_path / "article.dtd").write_text(DTD)
+    (tmp_path / "article.sch").write_text(SCHEMATRON)
+    settings.PACKAGE_XML_DTD = str(tmp_path / "article.dtd")
+    settings.PACKAGE_XML_SCHEMATRON = str(tmp_path / "article.sch")
+    yield validation.load_validator()
+    validation._validator = None
+
+
+@pytest.fixture
+def package(tmp_path):
+    path = tmp_path / "issue.zip"
+    path.write_bytes(
+        make_package(
+            {
+                "a/a.xml": VALID,
+                "b/b.xml": "<article>\n<body/></article>",
+                "c/c.xml": "<article><body>",
+                "c/c.pdf": b"%PDF",
+            }
+        ).getvalue()
+    )
+    return str(path)
+
+
+def test_validator_reports_structured_errors(rules, package):
+    results = validation.validate_package(package, workers=1)
+
+    assert [result["file"] for result in results] == ["a/a.xml", "b/b.xml", "c/c.xml"]
+    assert results[0]["errors"] == []
+    kinds = [error["kind"] for error in results[1]["errors"]]
+    assert kinds == ["dtd", "schematron"]
+    assert results[1]["errors"][1] == {
+        "kind": "schematron",
+        "line": 1,
+        "column": None,
+        "message": "article-type is required",
+        "location": "/article",
+    }
+    assert results[2]["errors"][0]["kind"] == "syntax"
+
+
+def test_package_is_validated_in_a_process_pool(rules, package):
+    assert validation.validate_package(package, workers=3) == (
+        validation.validate_package(package, workers=1)
+    )
+
+
+def test_validate_package_command(rules, package, tmp_path):
+    output = tmp_path / "errors.json"
+
+    with pytest.raises(CommandError, match="2 XML files are invalid"):
+        call_command("validate_package", package, workers=2, output=str(output))
+
+    results = json.loads(output.read_text())[package]
+    assert [bool(result["errors"]) for result in results] == [False, True, True]
+
+
+def submit(path, user, validate=True):
+    with open(path, "rb") as fp:
+        content = fp.read()
+    upload = Upload.objects.create(
+        filename="issue.zip", size=len(content), offset=len(content), user=user
+    )
+    uploads.create_partial_file(upload)
+    with open(upload.path, "wb") as fp:
+        fp.write(content)
+    uploads.assemble(upload)
+    if validate:
+        validate_upload.apply(args=(str(upload.id),))
+    upload.refresh_from_db()
+    return upload
+
+
+@pytest.mark.django_db
+def test_validate_upload_task_saves_the_errors(rules, package, admin_user, settings):
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+
+    upload = submit(package, admin_user)
+
+    assert upload.validation == validation.validate_package(package, workers=1)
+
+
+@pytest.mark.django_db
+def test_resubmission_validates_only_the_changed_files(
+    rules, package, admin_user, settings, tmp_path, monkeypatch
+):
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    first = submit(package, admin_user)
+    fixed = tmp_path / "fixed.zip"
+    fixed.write_bytes(
+        make_package(
+            {
+                "a/a.xml": VALID,
+                "b/b.xml": VALID,
+                "c/c.xml": "<article><body>",
+                "c/c.pdf": b"%PDF",
+            }
+        ).getvalue()
+    )
+    validated = []
+
+    def validate_member(path, name):
+        validated.append(name)
+        return validation.validate_member(path, name)
+
+    monkeypatch.setattr(tasks, "validate_member", validate_member)
+    second = submit(str(fixed), admin_user)
+
+    assert second.previous == first
+    assert second.changes["xml"] == ["b/b.xml"]
+    assert validated == ["b/b.xml"]
+    assert second.validation == validation.validate_package(str(fixed), workers=1)
+
+
+@pytest.mark.django_db
+def test_resubmission_of_a_deleted_upload_validates_every_file(
+    rules, package, admin_user, settings
+):
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    first = submit(package, admin_user)
+    second = submit(package, admin_user, validate=False)
+    assert second.changes["xml"] == []
+    first.delete()
+
+    validate_upload.apply(args=(str(second.id),))
+
+    second.refresh_from_db()
+    assert second.previous is None
+    assert second.validation == validation.validate_package(package, workers=1)
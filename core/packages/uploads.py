@@ -0,0 +1,174 @@
+"""
+Resumable, chunked upload of packages, following the tus protocol
+(https://tus.io/protocols/resumable-upload.html) with its creation,
+checksum, termination and expiration extensions.
+
+Each chunk is streamed from the request straight to the end of the partial
+file of its ``Upload``, at the offset recorded in the database, while its
+checksum is computed, and its new offset is recorded only if no other chunk
+was meanwhile. A chunk that doesn't match its checksum is truncated
+away, so a client only ever resends the chunk that failed. The partial file
+is finally moved into the documents storage, which is a rename when both
+are on the same filesystem, so the package is never read again to assemble
+it. The assembly runs in the ``core.packages.tasks.assemble_upload`` task,
+enqueued once the last chunk is committed, so that the request writing it
+returns right away.
+"""
+import base64
+import fcntl
+import hashlib
+import os
+import shutil
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from wagtail.documents import get_document_model
+
+from core.packages.inspector import inspect_package
+from core.packages.manifests import diff_inspections
+from core.packages.models import Upload
+
+TUS_VERSION = "1.0.0"
+TUS_EXTENSIONS = "creation,checksum,termination,expiration"
+CHECKSUM_ALGORITHMS = ["md5", "sha1", "sha256", "sha512"]
+BLOCK_SIZE = 64 * 1024
+
+# largest value of wagtail's Document.file_size
+MAX_DOCUMENT_FILE_SIZE = 2**31 - 1
+
+
+class ChecksumError(ValueError):
+    pass
+
+
+class OffsetError(ValueError):
+    pass
+
+
+def parse_metadata(header):
+    """Return the ``Upload-Metadata`` header as ``{key: value}``."""
+    metadata = {}
+    for pair in filter(None, (item.strip() for item in (header or "").split(","))):
+        key, __, value = pair.partition(" ")
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode()
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Invalid Upload-Metadata value for %s" % key)
+    return metadata
+
+
+def parse_checksum(header):
+    """Return the ``(algorithm, digest)`` of an ``Upload-Checksum`` header."""
+    algorithm, __, value = (header or "").strip().partition(" ")
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise ValueError("Unsupported checksum algorithm %r" % algorithm)
+    try:
+        return algorithm, base64.b64decode(value, validate=True)
+    except ValueError:
+        raise ValueError("Invalid Upload-Checksum digest")
+
+
+def create_partial_file(upload):
+    os.makedirs(os.path.dirname(upload.path), exist_ok=True)
+    open(upload.path, "wb").close()
+
+
+def write_chunk(upload, stream, length, checksum=None):
+    """
+    Append up to ``length`` bytes of ``stream`` to the partial file of
+    ``upload``, record its new offset and return how many were written.
+
+    The chunks of an upload are written one at a time under an exclusive
+    lock of its partial file, not of its row, so that no transaction stays
+    open while a chunk is received. Raises ``OffsetError`` when another chunk
+    was recorded, or the upload completed or deleted, since ``upload`` was
+    read. Raises ``ChecksumError``, leaving the file as it was, when the
+    chunk doesn't match ``checksum``. Without a checksum the bytes received
+    before the client disconnected are kept.
+    """
+    offset = upload.offset
+    recorded = Upload.objects.filter(pk=upload.pk, offset=offset)
+    digest = hashlib.new(checksum[0]) if checksum else None
+    written = 0
+    try:
+        fp = open(upload.path, "r+b")
+    except FileNotFoundError:
+        raise OffsetError("The upload was completed or deleted")
+    with fp:
+        # released when the file is closed
+        fcntl.flock(fp, fcntl.LOCK_EX)
+        if not recorded.exists():
+            raise OffsetError("Another chunk was written at offset %s" % offset)
+        # drop whatever a chunk interrupted before it was recorded wrote
+        fp.seek(offset)
+        fp.truncate()
+        while written < length:
+            block = stream.read(min(BLOCK_SIZE, length - written))
+            if not block:
+                break
+            fp.write(block)
+            if digest:
+                digest.update(block)
+            written += len(block)
+        if digest and digest.digest() != checksum[1]:
+            fp.truncate(offset)
+            raise ChecksumError("The chunk doesn't match its checksum")
+        fp.flush()
+        os.fsync(fp.fileno())
+        updated_at = timezone.now()
+        if not recorded.update(offset=offset + written, updated_at=updated_at):
+            raise OffsetError("The upload was deleted")
+    upload.offset = offset + written
+    upload.updated_at = updated_at
+    return written
+
+
+def move_to_storage(path, name):
+    """Move the file at ``path`` to ``name`` in the default storage."""
+    if hasattr(default_storage, "save_path"):
+        # see core.utils.storage.ContentAddressedStorage
+        return default_storage.save_path(name, path)
+    name = default_storage.get_available_name(name)
+    try:
+        target = default_storage.path(name)
+    except NotImplementedError:
+        with open(path, "rb") as fp:
+            name = default_storage.save(name, File(fp))
+        os.remove(path)
+        return name
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(path, target)
+    return name
+
+
+def assemble(upload):
+    """
+    Inspect the complete ``upload`` (see ``core.packages.inspector``), diff
+    it with the previous submission of the package, if any, and create its
+    document from its partial file.
+    """
+    upload.inspection = inspect_package(upload.path)
+    upload.previous = upload.get_previous_submission()
+    if upload.previous is not None:
+        upload.changes = diff_inspections(upload.previous.inspection, upload.inspection)
+    Document = get_document_model()
+    name = Document._meta.get_field("file").generate_filename(None, upload.filename)
+    document = Document(
+        title=upload.filename,
+        file=move_to_storage(upload.path, name),
+        uploaded_by_user=upload.user,
+        file_size=upload.size if upload.size <= MAX_DOCUMENT_FILE_SIZE else None,
+    )
+    document.save()
+    upload.document = document
+    upload.save(
+        update_fields=["inspection", "previous", "changes", "document", "updated_at"]
+    )
+    return document
+
+
+def delete_upload(upload):
+    if os.path.exists(upload.path):
+        os.remove(upload.path)
+    upload.delete()
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from core.packages import views
+
+app_name = "packages"
+urlpatterns = [
+    path("", view=views.UploadListView.as_view(), name="upload_list"),
+    path(
+        "<uuid:upload_id>/",
+        view=views.UploadDetailView.as_view(),
+        name="upload_detail",
+    ),
+]
@@ -0,0 +1,140 @@
+"""
+Validation of the XML files of packages against the JATS/SPS rules.
+
+The DTD, XSD and Schematron rules named by the ``PACKAGE_XML_*`` settings
+are compiled once per process by ``get_validator`` and reused for every
+file that process validates. ``validate_package`` spreads the XML files of
+a package over a pool of processes that each load the rules when they
+start; the Celery tasks of ``core.packages.tasks`` spread them over the
+worker processes instead, which load the rules when they start too.
+"""
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from lxml import etree, isoschematron
+
+SVRL = {"svrl": "http://purl.oclc.org/dsdl/svrl"}
+
+_validator = None
+
+
+def get_parser():
+    # never fetch the DTD or entities the files reference
+    return etree.XMLParser(load_dtd=False, resolve_entities=False, no_network=True)
+
+
+def log_errors(kind, error_log):
+    return [
+        {
+            "kind": kind,
+            "line": entry.line,
+            "column": entry.column,
+            "message": entry.message,
+        }
+        for entry in error_log
+    ]
+
+
+class XMLValidator:
+    """DTD, XSD and Schematron rules compiled once and applied to many files."""
+
+    def __init__(self, dtd=None, xsd=None, schematron=None):
+        self.dtd = etree.DTD(dtd) if dtd else None
+        self.xsd = etree.XMLSchema(etree.parse(xsd)) if xsd else None
+        self.schematron = None
+        if schematron:
+            self.schematron = isoschematron.Schematron(
+                etree.parse(schematron), store_report=True
+            )
+
+    def validate(self, fp):
+        """Return the errors of the XML file ``fp`` as a list of dicts."""
+        parser = get_parser()
+        try:
+            tree = etree.parse(fp, parser)
+        except etree.XMLSyntaxError as e:
+            return log_errors("syntax", parser.error_log.filter_from_errors()) or [
+                {"kind": "syntax", "line": None, "column": None, "message": str(e)}
+            ]
+
+        errors = []
+        if self.dtd is not None and not self.dtd.validate(tree):
+            errors.extend(log_errors("dtd", self.dtd.error_log.filter_from_errors()))
+        if self.xsd is not None and not self.xsd.validate(tree):
+            errors.extend(log_errors("xsd", self.xsd.error_log.filter_from_errors()))
+        if self.schematron is not None and not self.schematron.validate(tree):
+            errors.extend(self.schematron_errors(tree))
+        return errors
+
+    def schematron_errors(self, tree):
+        errors = []
+        report = self.schematron.validation_report
+        for failed in report.xpath("//svrl:failed-assert", namespaces=SVRL):
+            location = failed.get("location")
+            try:
+                line = tree.xpath(location)[0].sourceline
+            except (etree.XPathError, IndexError, AttributeError, TypeError):
+                line = None
+            errors.append(
+                {
+                    "kind": "schematron",
+                    "line": line,
+                    "column": None,
+                    "message": " ".join(
+                        failed.xpath("string(svrl:text)", namespaces=SVRL).split()
+                    ),
+                    "location": location,
+                }
+            )
+        return errors
+
+
+def load_validator():
+    """Compile the rules of the settings for the validations of this process."""
+    global _validator
+    _validator = XMLValidator(
+        dtd=settings.PACKAGE_XML_DTD or None,
+        xsd=settings.PACKAGE_XML_SCHEMA or None,
+        schematron=settings.PACKAGE_XML_SCHEMATRON or None,
+    )
+    return _validator
+
+
+def get_validator():
+    return _validator or load_validator()
+
+
+def get_xml_names(path):
+    with zipfile.ZipFile(path) as zf:
+        return sorted(
+            info.filename
+            for info in zf.infolist()
+            if not info.is_dir() and info.filename.lower().endswith(".xml")
+        )
+
+
+def validate_member(path, name):
+    """Return ``{"file": name, "errors": [...]}`` for one XML of a package."""
+    with zipfile.ZipFile(path) as zf, zf.open(name) as fp:
+        return {"file": name, "errors": get_validator().validate(fp)}
+
+
+def validate_package(path, workers=None):
+    """
+    Validate the XML files of the package at ``path`` in ``workers``
+    processes (PACKAGE_VALIDATION_WORKERS, or one per core, by default) and
+    return their results in the order of their names.
+    """
+    names = get_xml_names(path)
+    workers = workers or settings.PACKAGE_VALIDATION_WORKERS or os.cpu_count()
+    workers = min(workers, len(names))
+    if workers <= 1:
+        return [validate_member(path, name) for name in names]
+
+    # the forked processes must not share the connections of this one
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_validator) as pool:
+        return list(pool.map(validate_member, [path] * len(names), names))
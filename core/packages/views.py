@@ -0,0 +1,171 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.packages import uploads
+from core.packages.models import Upload
+from core.packages.tasks import assemble_upload
+
+# tus status of a chunk that doesn't match its checksum
+CHECKSUM_MISMATCH = 460
+
+
+class CanAddDocuments(BasePermission):
+    def has_permission(self, request, view):
+        return request.user.has_perm("wagtaildocs.add_document")
+
+
+def error(message, status_code=status.HTTP_400_BAD_REQUEST):
+    return Response({"message": message}, status=status_code)
+
+
+def get_int_header(request, name):
+    try:
+        value = int(request.headers[name])
+    except (KeyError, ValueError):
+        raise ValueError("The %s header must be an integer" % name)
+    if value < 0:
+        raise ValueError("The %s header must not be negative" % name)
+    return value
+
+
+class TusView(APIView):
+    permission_classes = [CanAddDocuments]
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        response["Tus-Resumable"] = uploads.TUS_VERSION
+        return response
+
+
+class UploadListView(TusView):
+    def options(self, request, *args, **kwargs):
+        return Response(
+            status=status.HTTP_204_NO_CONTENT,
+            headers={
+                "Tus-Version": uploads.TUS_VERSION,
+                "Tus-Extension": uploads.TUS_EXTENSIONS,
+                "Tus-Max-Size": str(settings.PACKAGE_UPLOAD_MAX_SIZE),
+                "Tus-Checksum-Algorithm": ",".join(uploads.CHECKSUM_ALGORITHMS),
+            },
+        )
+
+    def post(self, request):
+        """Create an upload of ``Upload-Length`` bytes."""
+        try:
+            size = get_int_header(request, "Upload-Length")
+            metadata = uploads.parse_metadata(request.headers.get("Upload-Metadata"))
+        except ValueError as e:
+            return error(str(e))
+        if size == 0:
+            return error("The Upload-Length header must be positive")
+        if size > settings.PACKAGE_UPLOAD_MAX_SIZE:
+            return error(
+                "Uploads are limited to %s bytes" % settings.PACKAGE_UPLOAD_MAX_SIZE,
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        filename = metadata.get("filename", "").strip()
+        if not filename:
+            return error("The filename is missing from Upload-Metadata")
+
+        upload = Upload.objects.create(filename=filename, size=size, user=request.user)
+        uploads.create_partial_file(upload)
+        location = request.build_absolute_uri(
+            reverse("packages:upload_detail", args=[upload.id])
+        )
+        return Response(status=status.HTTP_201_CREATED, headers={"Location": location})
+
+
+# chunks are written outside of any transaction, see uploads.write_chunk
+@method_decorator(transaction.non_atomic_requests, name="dispatch")
+class UploadDetailView(TusView):
+    def get_queryset(self):
+        return Upload.objects.filter(user=self.request.user)
+
+    def get_headers(self, upload):
+        headers = {
+            "Upload-Offset": str(upload.offset),
+            "Upload-Length": str(upload.size),
+            "Cache-Control": "no-store",
+        }
+        if not upload.is_complete:
+            headers["Upload-Expires"] = http_date(upload.expires_at.timestamp())
+        return headers
+
+    def head(self, request, upload_id):
+        upload = get_object_or_404(self.get_queryset(), pk=upload_id)
+        return Response(headers=self.get_headers(upload))
+
+    def get(self, request, upload_id):
+        upload = get_object_or_404(self.get_queryset(), pk=upload_id)
+        return Response(
+            {
+                "id": str(upload.id),
+                "filename": upload.filename,
+                "size": upload.size,
+                "offset": upload.offset,
+                "document": upload.document_id,
+                "inspection": upload.inspection,
+                "validation": upload.validation,
+                "previous": upload.previous_id and str(upload.previous_id),
+                "changes": upload.changes,
+            },
+            headers=self.get_headers(upload),
+        )
+
+    def patch(self, request, upload_id):
+        """Append the chunk in the body at ``Upload-Offset``."""
+        if request.content_type != "application/offset+octet-stream":
+            return error(
+                "Chunks must be sent as application/offset+octet-stream",
+                status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        try:
+            offset = get_int_header(request, "Upload-Offset")
+            length = get_int_header(request, "Content-Length")
+            checksum = None
+            if "Upload-Checksum" in request.headers:
+                checksum = uploads.parse_checksum(request.headers["Upload-Checksum"])
+        except ValueError as e:
+            return error(str(e))
+
+        upload = get_object_or_404(self.get_queryset(), pk=upload_id)
+        if offset != upload.offset:
+            return error(
+                "The upload is at offset %s" % upload.offset,
+                status.HTTP_409_CONFLICT,
+            )
+        if offset + length > upload.size:
+            return error("The chunk goes past Upload-Length")
+        if not upload.is_complete:
+            try:
+                uploads.write_chunk(upload, request.stream, length, checksum)
+            except uploads.OffsetError as e:
+                return error(str(e), status.HTTP_409_CONFLICT)
+            except uploads.ChecksumError as e:
+                return error(str(e), CHECKSUM_MISMATCH)
+        if upload.is_complete and upload.document_id is None:
+            # an empty chunk enqueues again the assembly of a complete
+            # upload whose document isn't created yet
+            transaction.on_commit(partial(assemble_upload.delay, str(upload.id)))
+
+        headers = self.get_headers(upload)
+        del headers["Upload-Length"]
+        return Response(status=status.HTTP_204_NO_CONTENT, headers=headers)
+
+    def delete(self, request, upload_id):
+        with transaction.atomic():
+            upload = get_object_or_404(
+                self.get_queryset().select_for_update(), pk=upload_id
+            )
+            uploads.delete_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.utils.translation import gettext_lazy as _
+
+
+class SearchConfig(AppConfig):
+    name = "core.search"
+    verbose_name = _("Search")
+
+    def ready(self):
+        try:
+            import core.search.signals  # noqa F401
+        except ImportError:
+            pass
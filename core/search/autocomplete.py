@@ -0,0 +1,219 @@
+"""
+In-memory prefix index of live page titles, used for search-as-you-type.
+
+Each worker process keeps one sorted array of normalized title keys per
+language and answers lookups with a binary search, without touching the
+database. The index is loaded once per process and then kept up to date
+incrementally: publishing, unpublishing or deleting a page appends the page
+id to a change journal kept in the cache (see ``core.search.signals``), and
+every process reloads only the journaled pages when it sees new entries.
+
+The generation is bumped before its journal entry is written, so a process
+may see an entry missing for a moment; it then catches up to the gap and
+tries again on its next sync. The index is only rebuilt from the database
+when the missing entries may have expired, that is when the process last
+caught up more than AUTOCOMPLETE_JOURNAL_TIMEOUT seconds ago.
+"""
+import bisect
+import logging
+import sys
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+from wagtail.core.models import Locale, Page
+
+from core.utils.cache import bump_generation, get_generation
+
+logger = logging.getLogger(__name__)
+
+GENERATION = "autocomplete"
+CHANGE_KEY = "search:autocomplete:change:%s"
+
+
+def normalize(text):
+    """Lowercase ``text`` and strip its accents."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+class PrefixIndex:
+    """
+    Sorted array of ``(key, page_id)`` pairs, one key for each word start
+    of a title, so that "brasil" finds "Revista Brasileira".
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.pages = {}
+
+    def __len__(self):
+        return len(self.pages)
+
+    def _keys(self, title):
+        normalized = normalize(title)
+        keys = []
+        start = 0
+        for word in normalized.split():
+            start = normalized.index(word, start)
+            keys.append(normalized[start:])
+            start += len(word)
+        return keys
+
+    def add(self, page_id, title, url):
+        self.remove(page_id)
+        keys = self._keys(title)
+        for key in keys:
+            bisect.insort(self.keys, (key, page_id))
+        self.pages[page_id] = (title, url, keys)
+
+    def load(self, entries):
+        """Add ``(page_id, title, url)`` entries, sorting the keys only once."""
+        for page_id, title, url in entries:
+            self.remove(page_id)
+            keys = self._keys(title)
+            self.keys.extend((key, page_id) for key in keys)
+            self.pages[page_id] = (title, url, keys)
+        self.keys.sort()
+
+    def remove(self, page_id):
+        if page_id not in self.pages:
+            return
+        for key in self.pages.pop(page_id)[2]:
+            position = bisect.bisect_left(self.keys, (key, page_id))
+            if position < len(self.keys) and self.keys[position] == (key, page_id):
+                del self.keys[position]
+
+    def lookup(self, prefix, limit):
+        prefix = normalize(prefix).strip()
+        if not prefix:
+            return []
+        found = []
+        position = bisect.bisect_left(self.keys, (prefix,))
+        while position < len(self.keys) and len(found) < limit:
+            key, page_id = self.keys[position]
+            if not key.startswith(prefix):
+                break
+            if page_id not in found:
+                found.append(page_id)
+            position += 1
+        return [
+            {"title": self.pages[page_id][0], "url": self.pages[page_id][1]}
+            for page_id in found
+        ]
+
+    def memory_usage(self):
+        """Approximate size in bytes of the keys, titles and urls held."""
+        size = sys.getsizeof(self.keys) + sys.getsizeof(self.pages)
+        for key, page_id in self.keys:
+            size += sys.getsizeof(key) + sys.getsizeof((key, page_id))
+        for entry in self.pages.values():
+            size += sum(sys.getsizeof(item) for item in entry)
+        return size
+
+
+class AutocompleteIndex:
+    """``PrefixIndex`` of every language, kept in sync with the journal."""
+
+    def __init__(self):
+        self.indexes = {}
+        self.generation = None
+        # when the generation of the index was read, see update()
+        self.synced_at = 0
+        self.checked_at = 0
+        self.lock = threading.Lock()
+
+    def pages(self, ids=None):
+        queryset = Page.objects.live().select_related("locale").filter(depth__gt=1)
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+        return queryset.only("id", "title", "url_path", "path", "depth", "locale")
+
+    def add(self, page):
+        language_code = page.locale.language_code.lower()
+        index = self.indexes.setdefault(language_code, PrefixIndex())
+        index.add(page.id, page.title, page.get_url())
+
+    def remove(self, page_id):
+        for index in self.indexes.values():
+            index.remove(page_id)
+
+    def build(self, generation, read_at):
+        entries = {locale.language_code.lower(): [] for locale in Locale.objects.all()}
+        for page in self.pages().iterator():
+            entries.setdefault(page.locale.language_code.lower(), []).append(
+                (page.id, page.title, page.get_url())
+            )
+        self.indexes = {}
+        for language_code, language_entries in entries.items():
+            self.indexes[language_code] = PrefixIndex()
+            self.indexes[language_code].load(language_entries)
+        self.generation = generation
+        self.synced_at = read_at
+        logger.info(
+            "Autocomplete index built with %s pages in %s bytes",
+            sum(len(index) for index in self.indexes.values()),
+            self.memory_usage(),
+        )
+
+    def update(self, generation, read_at):
+        numbers = range(self.generation + 1, generation + 1)
+        changes = cache.get_many([CHANGE_KEY % number for number in numbers])
+        ids = set()
+        applied = self.generation
+        for number in numbers:
+            if CHANGE_KEY % number not in changes:
+                break
+            ids.add(changes[CHANGE_KEY % number])
+            applied = number
+
+        if applied < generation:
+            # every missing entry was bumped after synced_at, so it can only
+            # have expired when synced_at is older than the journal timeout;
+            # otherwise it is still being written
+            if read_at - self.synced_at >= settings.AUTOCOMPLETE_JOURNAL_TIMEOUT:
+                return self.build(generation, read_at)
+
+        for page_id in ids:
+            self.remove(page_id)
+        for page in self.pages(ids):
+            self.add(page)
+        self.generation = applied
+        if applied == generation:
+            self.synced_at = read_at
+
+    def sync(self):
+        now = time.monotonic()
+        interval = settings.AUTOCOMPLETE_SYNC_INTERVAL
+        if self.generation is not None and now - self.checked_at < interval:
+            return
+        with self.lock:
+            self.checked_at = now
+            generation = get_generation(GENERATION)
+            if self.generation is None or generation < self.generation:
+                self.build(generation, now)
+            elif generation > self.generation:
+                self.update(generation, now)
+
+    def lookup(self, language_code, prefix, limit=None):
+        self.sync()
+        index = self.indexes.get(language_code.lower())
+        if index is None:
+            return []
+        return index.lookup(prefix, limit or settings.AUTOCOMPLETE_LIMIT)
+
+    def memory_usage(self):
+        return sum(index.memory_usage() for index in self.indexes.values())
+
+
+autocomplete_index = AutocompleteIndex()
+
+
+def page_changed(page_id):
+    """Journal ``page_id`` to be reloaded by every process."""
+    generation = bump_generation(GENERATION)
+    cache.set(
+        CHANGE_KEY % generation, page_id, timeout=settings.AUTOCOMPLETE_JOURNAL_TIMEOUT
+    )
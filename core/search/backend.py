@@ -0,0 +1,110 @@
+"""
+PostgreSQL full-text search backend aware of the page languages.
+
+Extends wagtail's database backend for PostgreSQL, which stores precomputed
+``tsvector`` columns in ``wagtailsearch_indexentry`` behind GIN indexes and
+ranks the results in SQL. Here each object is indexed with the text search
+configuration of its locale (``LANGUAGE_SEARCH_CONFIGS``) instead of a single
+``SEARCH_CONFIG``, and queries are stemmed with every configured language, so
+a page is found by the stems of its own language whatever the active one is.
+
+Configure it in ``WAGTAILSEARCH_BACKENDS``::
+
+    "default": {
+        "BACKEND": "core.search.backend",
+        "SEARCH_CONFIG": "portuguese",
+        "LANGUAGE_SEARCH_CONFIGS": {"pt-br": "portuguese", "en": "english"},
+    }
+"""
+from functools import reduce
+
+from django.utils import translation
+from wagtail.core.models import Locale
+from wagtail.search.backends.database.postgres.postgres import (
+    Index,
+    ObjectIndexer,
+    PostgresSearchBackend,
+    PostgresSearchQueryCompiler,
+)
+from wagtail.search.utils import get_content_type_pk
+
+
+class LocaleObjectIndexer(ObjectIndexer):
+    def __init__(self, obj, backend, config=None):
+        super().__init__(obj, backend)
+        if config:
+            self.config = config
+
+
+class LocaleIndex(Index):
+    def add_items(self, model, objs):
+        if not model.get_search_fields() or not objs:
+            return
+
+        language_codes = dict(Locale.objects.values_list("id", "language_code"))
+        indexers = [
+            LocaleObjectIndexer(
+                obj,
+                self.backend,
+                self.backend.get_config_for_language(
+                    language_codes.get(getattr(obj, "locale_id", None))
+                ),
+            )
+            for obj in objs
+        ]
+
+        content_type_pk = get_content_type_pk(model)
+        if self._enable_upsert:
+            self.add_items_upsert(content_type_pk, indexers)
+        else:
+            self.add_items_update_then_create(content_type_pk, indexers)
+
+
+class MultilingualSearchQueryCompiler(PostgresSearchQueryCompiler):
+    language_configs = ()
+
+    def get_config(self, backend):
+        self.language_configs = backend.language_configs
+        return backend.get_config_for_language(translation.get_language())
+
+    def build_tsquery(self, query, config=None):
+        tsqueries = [
+            self.build_tsquery_content(query, config=language_config)
+            for language_config in self.language_configs or [config]
+        ]
+        tsqueries = [tsquery for tsquery in tsqueries if tsquery is not None]
+        if not tsqueries:
+            return None
+        return reduce(lambda a, b: a | b, tsqueries)
+
+
+class MultilingualSearchBackend(PostgresSearchBackend):
+    query_compiler_class = MultilingualSearchQueryCompiler
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.language_search_configs = {
+            language_code.lower(): config
+            for language_code, config in params.get(
+                "LANGUAGE_SEARCH_CONFIGS", {}
+            ).items()
+        }
+        self.language_configs = sorted(set(self.language_search_configs.values()))
+
+    def get_config_for_language(self, language_code):
+        """
+        Return the text search configuration of ``language_code``, trying
+        ``pt-br`` and then ``pt`` before falling back to ``SEARCH_CONFIG``.
+        """
+        if language_code:
+            language_code = language_code.lower()
+            for code in (language_code, language_code.split("-")[0]):
+                if code in self.language_search_configs:
+                    return self.language_search_configs[code]
+        return self.config
+
+    def get_index_for_model(self, model, db_alias=None):
+        return LocaleIndex(self, db_alias)
+
+
+SearchBackend = MultilingualSearchBackend
@@ -0,0 +1,87 @@
+"""
+Cache of search result ids.
+
+The ids found for a query are cached per (normalized query, language, site)
+so that paginating over the results of a query does not run the search again.
+Publishing or unpublishing any page bumps the ``search-results`` generation,
+which invalidates every cached entry (see ``core.search.signals``).
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import translation
+from wagtail.core.models import Page, Site
+from wagtail.search.utils import normalise_query_string
+
+from core.utils.cache import get_generation
+
+GENERATION = "search-results"
+
+
+def get_cache_key(query_string, language_code, site_id):
+    digest = hashlib.md5(normalise_query_string(query_string).encode()).hexdigest()
+    return "search:results:%s:%s:%s:%s" % (
+        get_generation(GENERATION),
+        language_code,
+        site_id,
+        digest,
+    )
+
+
+class CachedSearchResults:
+    """
+    Sequence of live pages found for ``query_string``.
+
+    Only the ids of the first ``SEARCH_RESULTS_CACHE_MAX_IDS`` results are
+    cached. Slices inside that window are loaded by id; slices beyond it, and
+    the count of results when the window is full, fall back to the search.
+    """
+
+    def __init__(self, query_string, request):
+        self.query_string = query_string
+        site = Site.find_for_request(request)
+        self.cache_key = get_cache_key(
+            query_string, translation.get_language(), site and site.id
+        )
+        self.max_ids = settings.SEARCH_RESULTS_CACHE_MAX_IDS
+        self._ids = None
+
+    def search(self):
+        return Page.objects.live().search(self.query_string)
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = cache.get(self.cache_key)
+            if self._ids is None:
+                self._ids = [page.id for page in self.search()[: self.max_ids]]
+                cache.set(
+                    self.cache_key,
+                    self._ids,
+                    timeout=settings.SEARCH_RESULTS_CACHE_TIMEOUT,
+                )
+        return self._ids
+
+    @property
+    def is_complete(self):
+        return len(self.ids) < self.max_ids
+
+    def count(self):
+        if self.is_complete:
+            return len(self.ids)
+        return self.search().count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[slice(key, key + 1)][0]
+        start = key.start or 0
+        stop = key.stop if key.stop is not None else self.count()
+        if stop <= len(self.ids) or self.is_complete:
+            ids = self.ids[start:stop]
+            pages = Page.objects.live().in_bulk(ids)
+            return [pages[page_id] for page_id in ids if page_id in pages]
+        return list(self.search()[start:stop])
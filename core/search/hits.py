@@ -0,0 +1,134 @@
+"""
+Write-behind recording of search query hits.
+
+The search view only increments a counter in Redis; ``flush_hits`` (run by
+the ``core.search.tasks.flush_search_hits`` periodic task) moves the counters
+into wagtail.search's ``Query`` and ``QueryDailyHits`` tables in bulk, so
+``Query.get_most_popular`` stays eventually consistent with the searches done.
+"""
+import datetime
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from redis.exceptions import RedisError
+from wagtail.search.models import Query, QueryDailyHits
+from wagtail.search.utils import normalise_query_string
+
+from core.utils.cache import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+# hash of ``{query_string: hits}`` for one day
+HITS_KEY = "search:hits:{date}"
+# set of the HITS_KEY keys waiting to be flushed
+PENDING_KEY = "search:hits:pending"
+FLUSHING_SUFFIX = ":flushing"
+
+# delete the flushed hash, and the day from the pending set unless hits were
+# counted for it during the flush
+FINISH_SCRIPT = """
+redis.call("del", KEYS[3])
+if redis.call("exists", KEYS[2]) == 0 then
+    redis.call("srem", KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+def record_hit(query_string, date=None):
+    """
+    Count one hit for ``query_string``.
+
+    When the default cache is not Redis, or Redis is unavailable, the hit is
+    written straight to the database, as wagtail does.
+    """
+    query_string = normalise_query_string(query_string)
+    date = date or timezone.now().date()
+
+    conn = get_redis_connection()
+    if conn is not None:
+        key = HITS_KEY.format(date=date.isoformat())
+        try:
+            pipe = conn.pipeline(transaction=False)
+            pipe.hincrby(key, query_string, 1)
+            pipe.sadd(PENDING_KEY, key)
+            pipe.execute()
+            return
+        except RedisError as e:
+            logger.warning("Unable to record search hit in redis: %s", e)
+
+    Query.get(query_string).add_hit(date=date)
+
+
+def apply_hits(date, counts):
+    """
+    Add ``counts`` (``{query_string: hits}``) to the hits of ``date``.
+
+    Uses a fixed number of statements for the missing rows and one UPDATE per
+    distinct hit value, instead of the get_or_create and UPDATE done by
+    ``Query.add_hit`` for every single hit.
+    """
+    if not counts:
+        return
+    with transaction.atomic():
+        Query.objects.bulk_create(
+            [Query(query_string=query_string) for query_string in counts],
+            ignore_conflicts=True,
+        )
+        query_ids = dict(
+            Query.objects.filter(query_string__in=counts).values_list(
+                "query_string", "id"
+            )
+        )
+        QueryDailyHits.objects.bulk_create(
+            [
+                QueryDailyHits(query_id=query_id, date=date, hits=0)
+                for query_id in query_ids.values()
+            ],
+            ignore_conflicts=True,
+        )
+        ids_by_hits = defaultdict(list)
+        for query_string, hits in counts.items():
+            ids_by_hits[hits].append(query_ids[query_string])
+        for hits, ids in ids_by_hits.items():
+            QueryDailyHits.objects.filter(query_id__in=ids, date=date).update(
+                hits=F("hits") + hits
+            )
+
+
+def flush_hits():
+    """
+    Move the hits counted in Redis to the database.
+
+    Each day's hash is renamed before being read so that hits recorded during
+    the flush go to a fresh hash. The day stays in the pending set until its
+    hits are written, so a hash left behind by a failed or interrupted flush
+    is applied on the next run, which makes the flush at-least-once.
+
+    Returns the number of hits written.
+    """
+    conn = get_redis_connection()
+    if conn is None:
+        return 0
+
+    total = 0
+    for key in conn.smembers(PENDING_KEY):
+        key = key.decode() if isinstance(key, bytes) else key
+        flushing = key + FLUSHING_SUFFIX
+
+        # a leftover of a failed flush goes first, the new hits wait
+        if not conn.exists(flushing) and conn.exists(key):
+            conn.rename(key, flushing)
+
+        counts = {
+            query_string.decode(): int(hits)
+            for query_string, hits in conn.hgetall(flushing).items()
+        }
+        date = datetime.date.fromisoformat(key.rsplit(":", 1)[-1])
+        apply_hits(date, counts)
+        conn.eval(FINISH_SCRIPT, 3, PENDING_KEY, key, flushing, key)
+        total += sum(counts.values())
+    return total
@@ -0,0 +1,147 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from celery import group
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from wagtail.search.backends import get_search_backend
+from wagtail.search.index import get_indexed_models
+from wagtail.search.management.commands.update_index import group_models_by_index
+
+from core.search import reindex
+from core.search.tasks import reindex_chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the search index in chunks of primary keys, in parallel, "
+        "resuming from the last checkpoint with --resume"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backend",
+            dest="backend_name",
+            default=None,
+            help="Specify a backend to update",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of objects written to the index at once",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of processes indexing chunks at the same time",
+        )
+        parser.add_argument(
+            "--celery",
+            action="store_true",
+            help="Send the chunks to the Celery workers instead of a process pool",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default="reindex-checkpoint.json",
+            help="File where the indexed ranges are recorded",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip the ranges recorded in the checkpoint file",
+        )
+
+    def handle(self, **options):
+        if options["backend_name"]:
+            backend_names = [options["backend_name"]]
+        else:
+            backend_names = getattr(settings, "WAGTAILSEARCH_BACKENDS", {"default": {}})
+
+        checkpoint = reindex.Checkpoint(options["checkpoint"], resume=options["resume"])
+        for backend_name in backend_names:
+            self.update_backend(
+                backend_name,
+                checkpoint,
+                chunk_size=options["chunk_size"],
+                workers=options["workers"],
+                celery=options["celery"],
+                resume=options["resume"],
+            )
+        checkpoint.clear()
+
+    def update_backend(
+        self, backend_name, checkpoint, chunk_size, workers, celery, resume
+    ):
+        backend = get_search_backend(backend_name)
+        if not backend.rebuilder_class:
+            self.stdout.write("Backend '%s' doesn't require rebuilding" % backend_name)
+            return
+
+        atomic = backend.rebuilder_class is getattr(
+            backend, "atomic_rebuilder_class", None
+        )
+        if atomic and resume:
+            raise CommandError("An atomic rebuild of '%s' can't resume" % backend_name)
+        if atomic and (workers > 1 or celery):
+            self.stdout.write(
+                "%s: atomic rebuild, indexing in this process" % backend_name
+            )
+            workers, celery = 1, False
+
+        # one rebuilder per index, each writing to the index it started
+        rebuilders = []
+        indexes = {}
+        for index, models in group_models_by_index(
+            backend, get_indexed_models()
+        ).items():
+            rebuilder = backend.rebuilder_class(index)
+            if not resume:
+                index = rebuilder.start()
+            for model in models:
+                index.add_model(model)
+                indexes[model._meta.label] = index
+            rebuilders.append(rebuilder)
+
+        chunks = reindex.get_pending_chunks(backend_name, chunk_size, checkpoint)
+        self.stdout.write(
+            "%s: indexing %d chunks of %d objects"
+            % (backend_name, len(chunks), chunk_size)
+        )
+
+        object_count = 0
+        for chunk, count in self.run_chunks(chunks, indexes, workers, celery):
+            checkpoint.add(*chunk)
+            object_count += count
+            self.stdout.write("%s: %s [%s, %s) (%d objects)" % (*chunk, count))
+
+        for rebuilder in rebuilders:
+            rebuilder.finish()
+        self.stdout.write(
+            self.style.SUCCESS("%s: indexed %d objects" % (backend_name, object_count))
+        )
+
+    def run_chunks(self, chunks, indexes, workers, celery):
+        """
+        Yield ``(chunk, count)`` for each chunk as soon as it is indexed; the
+        chunks indexed in this process are written to ``indexes``, the index
+        of each model label, other processes write to the live indexes.
+        """
+        if celery:
+            result = group(reindex_chunk.s(*chunk) for chunk in chunks).apply_async()
+            for chunk, chunk_result in zip(chunks, result.results):
+                yield chunk, chunk_result.get()
+        elif workers > 1:
+            # the forked processes must not share the connections of this one
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(reindex.index_chunk, *chunk): chunk
+                    for chunk in chunks
+                }
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+        else:
+            for chunk in chunks:
+                yield chunk, reindex.index_chunk(*chunk, index=indexes[chunk[1]])
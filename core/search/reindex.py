@@ -0,0 +1,121 @@
+"""
+Chunked, parallel rebuild of the search index.
+
+The indexed objects of every model are split into primary key ranges. Each
+range is read and written to the index as one bulk statement, either in a
+local process pool or by the ``core.search.tasks.reindex_chunk`` Celery
+task, which writes it in smaller batches that it resumes from after a soft
+time limit, and recorded in a checkpoint file once done so that an interrupted
+rebuild can resume instead of starting from zero.
+
+An atomic rebuild (the ``ATOMIC_REBUILD`` option of the backend) writes to
+an index that only exists in the process that started it, a new index or
+an open transaction, so its chunks are all written by that process and it
+can't be resumed.
+
+The checkpoint records the primary key ranges indexed rather than the
+chunks: rows deleted between the runs shift the boundaries of the chunks
+split on resume, so a resumed rebuild indexes the ranges the checkpoint
+doesn't cover, split again into chunks.
+"""
+import json
+import os
+
+from django.apps import apps
+from wagtail.search.backends import get_search_backend
+from wagtail.search.index import get_indexed_models
+
+
+def get_chunks(model, chunk_size, start=None, stop=None):
+    """
+    Return the ``(start, stop)`` primary key ranges of ``model``, or of its
+    ``[start, stop)`` range, holding up to ``chunk_size`` indexed objects
+    each; ``stop`` is exclusive and ``None`` on the last range.
+    """
+    boundaries = []
+    pks = model.get_indexed_objects().order_by("pk").values_list("pk", flat=True)
+    if start is not None:
+        pks = pks.filter(pk__gte=start)
+    if stop is not None:
+        pks = pks.filter(pk__lt=stop)
+    for position, pk in enumerate(pks.iterator(chunk_size=chunk_size)):
+        if position % chunk_size == 0:
+            boundaries.append(pk)
+    return list(zip(boundaries, boundaries[1:] + [None]))
+
+
+def index_chunk(backend_name, model_label, start, stop, index=None):
+    """
+    Write the objects of ``model_label`` in ``[start, stop)`` to ``index``,
+    the live index of the model by default.
+    """
+    model = apps.get_model(model_label)
+    objects = model.get_indexed_objects().filter(pk__gte=start)
+    if stop is not None:
+        objects = objects.filter(pk__lt=stop)
+    objects = list(objects.order_by("pk"))
+    if index is None:
+        index = get_search_backend(backend_name).get_index_for_model(model)
+    if index and objects:
+        index.add_items(model, objects)
+    return len(objects)
+
+
+def get_checkpoint_key(backend_name, model_label):
+    return "%s:%s" % (backend_name, model_label)
+
+
+class Checkpoint:
+    """
+    ``[start, stop)`` primary key ranges already indexed, per backend and
+    model, persisted as a JSON file.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.done = {}
+        if resume and os.path.exists(path):
+            with open(path) as fp:
+                self.done = json.load(fp)
+
+    def add(self, backend_name, model_label, start, stop):
+        key = get_checkpoint_key(backend_name, model_label)
+        self.done.setdefault(key, []).append([start, stop])
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as fp:
+            json.dump(self.done, fp, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get_gaps(self, backend_name, model_label):
+        """
+        Return the ``(start, stop)`` ranges not indexed yet, in order; None
+        is an unbounded start or stop.
+        """
+        ranges = self.done.get(get_checkpoint_key(backend_name, model_label), [])
+        gaps = []
+        covered = None
+        for start, stop in sorted(ranges):
+            if covered is None or start > covered:
+                gaps.append((covered, start))
+            if stop is None:
+                return gaps
+            covered = stop if covered is None else max(covered, stop)
+        gaps.append((covered, None))
+        return gaps
+
+    def clear(self):
+        self.done = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def get_pending_chunks(backend_name, chunk_size, checkpoint):
+    """Return the ``(backend_name, model_label, start, stop)`` to index."""
+    pending = []
+    for model in get_indexed_models():
+        model_label = model._meta.label
+        for gap_start, gap_stop in checkpoint.get_gaps(backend_name, model_label):
+            for start, stop in get_chunks(model, chunk_size, gap_start, gap_stop):
+                stop = gap_stop if stop is None else stop
+                pending.append((backend_name, model_label, start, stop))
+    return pending
@@ -0,0 +1,24 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from wagtail.core.models import Page
+from wagtail.core.signals import page_published, page_unpublished
+
+from core.search import autocomplete
+from core.search.cache import GENERATION
+from core.utils.cache import bump_generation
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+def invalidate_search_results(sender, **kwargs):
+    transaction.on_commit(partial(bump_generation, GENERATION))
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_delete, sender=Page)
+def update_autocomplete(sender, instance, **kwargs):
+    transaction.on_commit(partial(autocomplete.page_changed, instance.id))
@@ -0,0 +1,36 @@
+from django.apps import apps
+from django.conf import settings
+
+from config import celery_app
+from core.search.hits import flush_hits
+from core.search.reindex import get_chunks, index_chunk
+from core.utils.tasks import CheckpointedTask, UniqueTask
+
+
+@celery_app.task(base=UniqueTask)
+def flush_search_hits():
+    """Write the search hits counted in Redis to wagtail.search's tables."""
+    return flush_hits()
+
+
+@celery_app.task(bind=True, base=CheckpointedTask)
+def reindex_chunk(self, backend_name, model_label, start, stop):
+    """
+    Write one chunk of the ``reindex`` management command to the index, in
+    batches of ``SEARCH_REINDEX_BATCH_SIZE`` checkpointed one by one.
+    """
+    checkpoint = self.load_checkpoint({"start": start, "count": 0})
+    batches = get_chunks(
+        apps.get_model(model_label),
+        settings.SEARCH_REINDEX_BATCH_SIZE,
+        checkpoint["start"],
+        stop,
+    )
+    for batch_start, batch_stop in batches:
+        batch_stop = stop if batch_stop is None else batch_stop
+        checkpoint["count"] += index_chunk(
+            backend_name, model_label, batch_start, batch_stop
+        )
+        checkpoint["start"] = batch_stop
+        self.save_checkpoint(checkpoint)
+    return checkpoint["count"]
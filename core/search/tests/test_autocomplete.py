@@ -0,0 +1,98 @@
+from unittest.mock import Mock
+
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+
+from core.home.models import HomePage
+from core.search.autocomplete import (
+    CHANGE_KEY,
+    GENERATION,
+    AutocompleteIndex,
+    PrefixIndex,
+    autocomplete_index,
+)
+from core.utils.cache import bump_generation
+
+
+class TestPrefixIndex:
+    def test_lookup_matches_word_starts_without_accents(self):
+        index = PrefixIndex()
+        index.add(1, "Revista Brasileira de Ciências", "/revista/")
+        index.add(2, "Ciência Hoje", "/ciencia/")
+
+        assert index.lookup("brasil", 8) == [
+            {"title": "Revista Brasileira de Ciências", "url": "/revista/"}
+        ]
+        assert [r["url"] for r in index.lookup("Ciên", 8)] == ["/ciencia/", "/revista/"]
+        assert index.lookup("", 8) == []
+
+    def test_remove_and_limit(self):
+        index = PrefixIndex()
+        for page_id in range(5):
+            index.add(page_id, "Journal %s" % page_id, "/%s/" % page_id)
+
+        index.remove(3)
+
+        assert len(index) == 4
+        assert len(index.lookup("journal", 2)) == 2
+        assert "/3/" not in [r["url"] for r in index.lookup("journal", 8)]
+        assert index.memory_usage() > 0
+
+
+@pytest.mark.django_db
+class TestAutocompleteView:
+    @pytest.fixture(autouse=True)
+    def reset_index(self, settings):
+        settings.AUTOCOMPLETE_SYNC_INTERVAL = 0
+        cache.clear()
+        autocomplete_index.generation = None
+
+    def test_returns_live_titles_of_the_language(
+        self, client: Client, home_page: HomePage
+    ):
+        home_page.add_child(instance=HomePage(title="Preprints"))
+
+        response = client.get(reverse("autocomplete"), {"query": "pre"})
+
+        assert response.json() == {
+            "results": [{"title": "Preprints", "url": "/pt-br/preprints/"}]
+        }
+
+    def test_published_pages_are_added_incrementally(
+        self, client: Client, home_page: HomePage, django_capture_on_commit_callbacks
+    ):
+        client.get(reverse("autocomplete"), {"query": "pre"})
+        page = home_page.add_child(instance=HomePage(title="Preprints", live=False))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            page.save_revision().publish()
+
+        response = client.get(reverse("autocomplete"), {"query": "pre"})
+        assert [r["title"] for r in response.json()["results"]] == ["Preprints"]
+
+    def test_unwritten_journal_entry_is_retried_without_rebuilding(
+        self, home_page: HomePage, monkeypatch
+    ):
+        index = AutocompleteIndex()
+        index.sync()
+        page = home_page.add_child(instance=HomePage(title="Preprints"))
+        # the generation was bumped, its entry is not written yet
+        generation = bump_generation(GENERATION)
+        monkeypatch.setattr(index, "build", Mock(side_effect=AssertionError))
+
+        assert index.lookup("pt-BR", "pre") == []
+
+        cache.set(CHANGE_KEY % generation, page.id)
+        assert [r["title"] for r in index.lookup("pt-BR", "pre")] == ["Preprints"]
+        assert index.generation == generation
+
+    def test_expired_journal_rebuilds_the_index(self, home_page: HomePage, settings):
+        index = AutocompleteIndex()
+        index.sync()
+        home_page.add_child(instance=HomePage(title="Preprints"))
+        bump_generation(GENERATION)
+        index.synced_at -= settings.AUTOCOMPLETE_JOURNAL_TIMEOUT
+
+        assert [r["title"] for r in index.lookup("pt-BR", "pre")] == ["Preprints"]
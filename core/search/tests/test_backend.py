@@ -0,0 +1,34 @@
+import pytest
+from django.utils import translation
+from wagtail.core.models import Locale, Page
+from wagtail.search.backends import get_search_backend
+from wagtail.search.models import IndexEntry
+
+from core.home.models import HomePage
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def english_page(home_page: HomePage):
+    locale = Locale.objects.create(language_code="en")
+    root = home_page.copy_for_translation(locale)
+    return root.add_child(instance=HomePage(title="Running journals", locale=locale))
+
+
+def test_backend_maps_languages_to_configs():
+    backend = get_search_backend()
+
+    assert backend.get_config_for_language("pt-BR") == "portuguese"
+    assert backend.get_config_for_language("en-us") == "english"
+    assert backend.get_config_for_language("de") == "portuguese"
+
+
+def test_pages_are_stemmed_in_their_own_language(english_page: HomePage):
+    entry = IndexEntry.objects.get(object_id=str(english_page.id))
+    assert "run" in str(entry.title)
+
+    with translation.override("pt-br"):
+        results = list(Page.objects.live().search("journal"))
+
+    assert english_page.id in [page.id for page in results]
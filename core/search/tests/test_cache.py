@@ -0,0 +1,52 @@
+import pytest
+from django.core.cache import cache
+from django.test import RequestFactory
+
+from core.home.models import HomePage
+from core.search.cache import CachedSearchResults
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def test_results_are_cached_by_id(home_page: HomePage, rf: RequestFactory, settings):
+    settings.SEARCH_RESULTS_CACHE_MAX_IDS = 10
+    for i in range(3):
+        home_page.add_child(instance=HomePage(title="Journal %s" % i))
+
+    results = CachedSearchResults("journal", rf.get("/search/"))
+
+    assert results.count() == 3
+    assert cache.get(results.cache_key) == results.ids
+    assert [page.id for page in results[0:2]] == results.ids[0:2]
+    assert len(results[0:10]) == 3
+
+
+def test_publishing_invalidates_cached_ids(
+    home_page: HomePage, rf: RequestFactory, django_capture_on_commit_callbacks
+):
+    page = home_page.add_child(instance=HomePage(title="Journal"))
+    results = CachedSearchResults("journal", rf.get("/search/"))
+    assert results.count() == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        page.save_revision().publish()
+
+    assert (
+        CachedSearchResults("journal", rf.get("/search/")).cache_key
+        != results.cache_key
+    )
+
+
+def test_unpublished_pages_are_not_listed(home_page: HomePage, rf: RequestFactory):
+    page = home_page.add_child(instance=HomePage(title="Journal"))
+    results = CachedSearchResults("journal", rf.get("/search/"))
+    assert results.ids == [page.id]
+
+    HomePage.objects.filter(id=page.id).update(live=False)
+
+    assert results[0:10] == []
@@ -0,0 +1,101 @@
+import datetime
+from collections import defaultdict
+from unittest.mock import Mock
+
+import pytest
+from django.db import DatabaseError
+from wagtail.search.models import Query
+
+from core.search import hits
+from core.search.hits import apply_hits, flush_hits, record_hit
+
+pytestmark = pytest.mark.django_db
+
+
+def test_record_hit_without_redis_writes_to_database():
+    record_hit("  Open   Science ")
+    record_hit("open science")
+
+    query = Query.objects.get(query_string="open science")
+    assert query.hits == 2
+
+
+def test_apply_hits_creates_and_increments():
+    date = datetime.date(2022, 6, 1)
+    Query.get("scielo").add_hit(date=date)
+
+    apply_hits(date, {"scielo": 3, "preprints": 1, "journals": 3})
+
+    popular = [(q.query_string, q._hits) for q in Query.get_most_popular()]
+    assert popular[0] == ("scielo", 4)
+    assert sorted(popular[1:]) == [("journals", 3), ("preprints", 1)]
+
+
+def test_flush_hits_without_redis_is_noop():
+    assert flush_hits() == 0
+
+
+class FakeRedis:
+    """The hash and set commands of a redis client used by the hits."""
+
+    def __init__(self):
+        self.hashes = defaultdict(dict)
+        self.sets = defaultdict(set)
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        return []
+
+    def hincrby(self, key, field, amount):
+        field = field.encode()
+        self.hashes[key][field] = self.hashes[key].get(field, 0) + amount
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def sadd(self, key, member):
+        self.sets[key].add(member.encode())
+
+    def smembers(self, key):
+        return set(self.sets[key])
+
+    def exists(self, key):
+        return int(bool(self.hashes.get(key)))
+
+    def rename(self, key, new_key):
+        self.hashes[new_key] = self.hashes.pop(key)
+
+    def eval(self, script, numkeys, pending, key, flushing, member):
+        assert script == hits.FINISH_SCRIPT
+        self.hashes.pop(flushing, None)
+        if not self.exists(key):
+            self.sets[pending].discard(member.encode())
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    conn = FakeRedis()
+    monkeypatch.setattr(hits, "get_redis_connection", lambda: conn)
+    return conn
+
+
+def test_failed_flush_keeps_the_hits_for_the_next_one(redis, monkeypatch):
+    date = datetime.date(2022, 6, 1)
+    record_hit("scielo", date=date)
+    record_hit("scielo", date=date)
+    monkeypatch.setattr(hits, "apply_hits", Mock(side_effect=DatabaseError))
+
+    with pytest.raises(DatabaseError):
+        flush_hits()
+    record_hit("scielo", date=date)
+    monkeypatch.undo()
+    monkeypatch.setattr(hits, "get_redis_connection", lambda: redis)
+
+    # the leftover of the failed flush first, then the hit counted since
+    assert flush_hits() == 2
+    assert flush_hits() == 1
+    assert Query.get("scielo").hits == 3
+    assert not redis.sets[hits.PENDING_KEY]
+    assert not any(redis.hashes.values())
@@ -0,0 +1,169 @@
+import pytest
+from celery.exceptions import SoftTimeLimitExceeded
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import CommandError, call_command
+from wagtail.search.models import IndexEntry
+
+from core.home.models import HomePage
+from core.search import reindex, tasks
+from core.search.backend import MultilingualSearchBackend
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def journals(home_page: HomePage):
+    return [
+        home_page.add_child(instance=HomePage(title="Journal %s" % i)) for i in range(5)
+    ]
+
+
+def test_get_chunks_splits_primary_keys(journals):
+    chunks = reindex.get_chunks(HomePage, 2)
+
+    ids = [home_page.id for home_page in HomePage.objects.order_by("pk")]
+    assert chunks == [(ids[0], ids[2]), (ids[2], ids[4]), (ids[4], None)]
+
+
+def indexed_home_pages():
+    return {
+        int(object_id)
+        for object_id in IndexEntry.objects.filter(
+            content_type=ContentType.objects.get_for_model(HomePage)
+        ).values_list("object_id", flat=True)
+    }
+
+
+def test_reindex_command_indexes_every_chunk(journals, tmp_path):
+    checkpoint = tmp_path / "checkpoint.json"
+    IndexEntry.objects.all().delete()
+
+    call_command("reindex", workers=1, chunk_size=2, checkpoint=str(checkpoint))
+
+    assert indexed_home_pages() == set(HomePage.objects.values_list("id", flat=True))
+    assert not checkpoint.exists()
+
+
+def test_reindex_command_resumes_from_checkpoint(journals, tmp_path):
+    checkpoint = tmp_path / "checkpoint.json"
+    chunks = reindex.get_chunks(HomePage, 2)
+    reindex.Checkpoint(str(checkpoint)).add("default", "home.HomePage", *chunks[0])
+    IndexEntry.objects.all().delete()
+
+    call_command(
+        "reindex", workers=1, chunk_size=2, checkpoint=str(checkpoint), resume=True
+    )
+
+    ids = list(HomePage.objects.order_by("pk").values_list("id", flat=True))
+    assert indexed_home_pages() == set(ids[2:])
+
+
+def test_resume_indexes_the_ranges_missed_after_deletions(journals, tmp_path):
+    checkpoint = tmp_path / "checkpoint.json"
+    ids = list(HomePage.objects.order_by("pk").values_list("id", flat=True))
+    reindex.Checkpoint(str(checkpoint)).add("default", "home.HomePage", ids[0], ids[2])
+    # the chunks split again start with [ids[0], ids[3])
+    HomePage.objects.get(id=ids[1]).delete()
+    IndexEntry.objects.all().delete()
+
+    call_command(
+        "reindex", workers=1, chunk_size=2, checkpoint=str(checkpoint), resume=True
+    )
+
+    assert indexed_home_pages() == set(ids[2:])
+
+
+class RecordingIndex:
+    def __init__(self, index):
+        self.index = index
+        self.models = []
+        self.items = []
+
+    def add_model(self, model):
+        self.models.append(model)
+
+    def add_items(self, model, objs):
+        self.items.extend(objs)
+        self.index.add_items(model, objs)
+
+
+class RecordingRebuilder:
+    started = []
+    finished = []
+
+    def __init__(self, index):
+        self.index = index
+
+    def start(self):
+        index = RecordingIndex(self.index)
+        self.started.append(index)
+        return index
+
+    def finish(self):
+        self.finished.append(self.index)
+
+
+@pytest.fixture
+def rebuilder(monkeypatch):
+    monkeypatch.setattr(
+        MultilingualSearchBackend, "rebuilder_class", RecordingRebuilder
+    )
+    monkeypatch.setattr(RecordingRebuilder, "started", [])
+    monkeypatch.setattr(RecordingRebuilder, "finished", [])
+    return RecordingRebuilder
+
+
+def test_reindex_command_writes_to_the_started_index(journals, tmp_path, rebuilder):
+    checkpoint = tmp_path / "checkpoint.json"
+
+    call_command("reindex", workers=1, chunk_size=2, checkpoint=str(checkpoint))
+
+    # every model shares the index of the backend
+    (index,) = rebuilder.started
+    assert len(rebuilder.finished) == 1
+    assert HomePage in index.models
+    assert {item.pk for item in index.items if isinstance(item, HomePage)} == set(
+        HomePage.objects.values_list("id", flat=True)
+    )
+
+
+def test_atomic_rebuild_runs_in_this_process(
+    journals, tmp_path, rebuilder, monkeypatch
+):
+    monkeypatch.setattr(
+        MultilingualSearchBackend, "atomic_rebuilder_class", RecordingRebuilder
+    )
+    checkpoint = tmp_path / "checkpoint.json"
+
+    call_command("reindex", workers=4, chunk_size=2, checkpoint=str(checkpoint))
+
+    (index,) = rebuilder.started
+    assert HomePage.objects.get(pk=journals[0].pk) in index.items
+    with pytest.raises(CommandError):
+        call_command("reindex", checkpoint=str(checkpoint), resume=True)
+
+
+def test_reindex_chunk_resumes_from_its_last_batch(journals, settings, monkeypatch):
+    settings.SEARCH_REINDEX_BATCH_SIZE = 2
+    ids = list(HomePage.objects.order_by("pk").values_list("id", flat=True))
+    IndexEntry.objects.all().delete()
+    batches = []
+
+    def index_chunk(backend_name, model_label, start, stop):
+        if len(batches) == 1:
+            batches.append("interrupted")
+            raise SoftTimeLimitExceeded()
+        batches.append((start, stop))
+        return reindex.index_chunk(backend_name, model_label, start, stop)
+
+    monkeypatch.setattr(tasks, "index_chunk", index_chunk)
+    result = tasks.reindex_chunk.apply(args=("default", "home.HomePage", ids[0], None))
+
+    assert result.get() == len(ids)
+    assert batches == [
+        (ids[0], ids[2]),
+        "interrupted",
+        (ids[2], ids[4]),
+        (ids[4], None),
+    ]
+    assert indexed_home_pages() == set(ids)
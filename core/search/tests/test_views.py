@@ -0,0 +1,46 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.home.models import HomePage
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def journals(home_page: HomePage, settings):
+    cache.clear()
+    settings.SEARCH_RESULTS_CACHE_MAX_IDS = 12
+    return [
+        home_page.add_child(instance=HomePage(title="Journal %s" % i))
+        for i in range(15)
+    ]
+
+
+def test_search_paginates_without_counting(client: Client, journals):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse("search"), {"query": "journal", "page": 2})
+
+    page = response.context["search_results"]
+    assert len(page) == 5
+    assert page.has_previous() and not page.has_next()
+    assert not any("COUNT(" in query["sql"].upper() for query in queries)
+
+
+def test_search_first_page_has_next(client: Client, journals):
+    response = client.get(reverse("search"), {"query": "journal"})
+
+    page = response.context["search_results"]
+    assert len(page) == 10
+    assert page.has_next() and not page.has_previous()
+    assert b"page=2" in response.content
+
+
+def test_search_page_past_the_end_links_back(client: Client, journals):
+    response = client.get(reverse("search"), {"query": "journal", "page": 9})
+
+    assert len(response.context["search_results"]) == 0
+    assert b"page=8" in response.content
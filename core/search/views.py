@@ -1,7 +1,12 @@
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.utils import translation
 from wagtail.core.models import Page
-from wagtail.search.models import Query
+
+from core.search.autocomplete import autocomplete_index
+from core.search.cache import CachedSearchResults
+from core.search.hits import record_hit
+from core.utils.paginator import CountFreePaginator
 
 
 def search(request):
@@ -10,25 +15,26 @@ def search(request):
 
     # Search
     if search_query:
-        search_results = Page.objects.live().search(search_query)
-        query = Query.get(search_query)
+        search_results = CachedSearchResults(search_query, request)
 
         # Record hit
-        query.add_hit()
+        record_hit(search_query)
     else:
         search_results = Page.objects.none()
 
     # Pagination
-    paginator = Paginator(search_results, 10)
-    try:
-        search_results = paginator.page(page)
-    except PageNotAnInteger:
-        search_results = paginator.page(1)
-    except EmptyPage:
-        search_results = paginator.page(paginator.num_pages)
+    paginator = CountFreePaginator(search_results, 10)
+    search_results = paginator.page(page)
 
     return render(
         request,
         "search/search.html",
         {"search_query": search_query, "search_results": search_results},
     )
+
+
+def autocomplete(request):
+    results = autocomplete_index.lookup(
+        translation.get_language(), request.GET.get("query", "")
+    )
+    return JsonResponse({"results": results})
@@ -0,0 +1,355 @@
+import json
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from wagtail.core.models import Page
+
+from core.api import CursorPagination
+from core.home.models import ChangeLog, FormPage, HomePage
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+def selects(queries):
+    return [query for query in queries if query["sql"].startswith("SELECT")]
+
+
+@pytest.fixture
+def pages_url():
+    return reverse("wagtailapi:pages:listing")
+
+
+def test_listing_has_validators(client: Client, home_page: HomePage, pages_url):
+    home_page.add_child(instance=HomePage(title="News")).save_revision().publish()
+
+    response = client.get(pages_url)
+
+    assert response.status_code == 200
+    assert response["ETag"]
+    assert "Last-Modified" not in response
+    assert "Accept" in response["Vary"]
+
+
+def test_unchanged_listing_is_not_modified(
+    client: Client, home_page: HomePage, pages_url
+):
+    etag = client.get(pages_url)["ETag"]
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(pages_url, HTTP_IF_NONE_MATCH=etag)
+
+    assert response.status_code == 304
+    assert selects(queries) == []
+
+
+def test_anonymous_responses_are_cached(client: Client, home_page: HomePage, pages_url):
+    content = client.get(pages_url).content
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(pages_url)
+
+    assert response.content == content
+    assert selects(queries) == []
+
+
+def test_publishing_changes_the_etag(
+    client: Client, home_page: HomePage, pages_url, django_capture_on_commit_callbacks
+):
+    etag = client.get(pages_url)["ETag"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        home_page.add_child(instance=HomePage(title="News"))
+
+    response = client.get(pages_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    assert "News" in response.content.decode()
+
+
+def test_unpublishing_changes_the_etag(
+    client: Client, home_page: HomePage, pages_url, django_capture_on_commit_callbacks
+):
+    page = home_page.add_child(instance=HomePage(title="News", live=False))
+    with django_capture_on_commit_callbacks(execute=True):
+        page.save_revision().publish()
+    etag = client.get(pages_url)["ETag"]
+
+    page.refresh_from_db()
+    with django_capture_on_commit_callbacks(execute=True):
+        page.unpublish()
+
+    response = client.get(pages_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert "News" not in response.content.decode()
+
+
+def test_deleting_changes_only_the_etag_of_pages(
+    client: Client, home_page: HomePage, pages_url, django_capture_on_commit_callbacks
+):
+    page = home_page.add_child(instance=HomePage(title="News"))
+    etag = client.get(pages_url)["ETag"]
+    documents_url = reverse("wagtailapi:documents:listing")
+    documents_etag = client.get(documents_url)["ETag"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        page.delete()
+
+    response = client.get(pages_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert "News" not in response.content.decode()
+    response = client.get(documents_url, HTTP_IF_NONE_MATCH=documents_etag)
+    assert response.status_code == 304
+
+
+def test_cached_responses_follow_the_negotiated_renderer(
+    client: Client, home_page: HomePage, pages_url
+):
+    html = client.get(pages_url, HTTP_ACCEPT="text/html")
+    assert html["Content-Type"].startswith("text/html")
+
+    response = client.get(pages_url, HTTP_ACCEPT="application/json")
+
+    assert response["Content-Type"] == "application/json"
+    assert response["ETag"] != html["ETag"]
+    assert client.get(pages_url, HTTP_ACCEPT="text/html").content == html.content
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["", "?fields=*", "?fields=locale,alias_of", "?type=home.FormPage&fields=*"],
+)
+def test_listing_queries_do_not_grow_with_size(
+    client: Client, home_page: HomePage, pages_url, query
+):
+    def count_selects():
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(pages_url + query)
+        assert response.status_code == 200
+        return len(selects(queries))
+
+    def add_pages(number):
+        for __ in range(number):
+            section = home_page.add_child(instance=HomePage(title="Section"))
+            section.add_child(instance=FormPage(title="Form", intro="<p>Form</p>"))
+
+    add_pages(1)
+    count_selects()
+    small = count_selects()
+    add_pages(10)
+
+    assert count_selects() == small
+
+
+def test_documents_listing_is_not_modified(client: Client):
+    url = reverse("wagtailapi:documents:listing")
+    etag = client.get(url)["ETag"]
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+def read_export(response):
+    content = b"".join(response.streaming_content).decode()
+    return [json.loads(line) for line in content.splitlines()]
+
+
+def test_export_streams_every_page(client: Client, home_page: HomePage, settings):
+    settings.API_EXPORT_CHUNK_SIZE = 2
+    for number in range(5):
+        home_page.add_child(instance=HomePage(title="Page %s" % number))
+
+    response = client.get(reverse("wagtailapi:pages:export") + "?fields=_,title")
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+    items = read_export(response)
+    ids = [item["id"] for item in items]
+    assert ids == sorted(ids)
+    assert [item["title"] for item in items][-5:] == ["Page %s" % n for n in range(5)]
+
+
+def test_export_resumes_after_id(client: Client, home_page: HomePage, settings):
+    settings.API_EXPORT_CHUNK_SIZE = 2
+    for number in range(5):
+        home_page.add_child(instance=HomePage(title="Page %s" % number))
+    url = reverse("wagtailapi:pages:export")
+    items = read_export(client.get(url))
+
+    resumed = read_export(client.get(url + "?after=%s" % items[2]["id"]))
+
+    assert resumed == items[3:]
+
+
+def test_export_queries_are_chunked(client: Client, home_page: HomePage, settings):
+    settings.API_EXPORT_CHUNK_SIZE = 4
+    for number in range(10):
+        home_page.add_child(instance=HomePage(title="Page %s" % number))
+    response = client.get(reverse("wagtailapi:pages:export"))
+
+    with CaptureQueriesContext(connection) as queries:
+        items = read_export(response)
+
+    assert len(items) == Page.objects.live().public().filter(depth__gt=1).count()
+    chunks = [q for q in selects(queries) if q["sql"].endswith("LIMIT 4")]
+    assert len(chunks) == len(items) // 4 + 1
+
+
+def test_export_rejects_listing_parameters(client: Client):
+    url = reverse("wagtailapi:documents:export")
+
+    assert client.get(url + "?offset=20").status_code == 400
+    assert client.get(url + "?after=last").status_code == 400
+
+
+@pytest.fixture
+def changes_url():
+    return reverse("wagtailapi:changes:listing")
+
+
+def test_changes_feed_returns_deltas(client: Client, home_page: HomePage, changes_url):
+    since = client.get(changes_url).json()["meta"]["since"]
+    page = home_page.add_child(instance=HomePage(title="News"))
+    page.save_revision().publish()
+
+    data = client.get(changes_url, {"since": since}).json()
+
+    assert [(item["object_id"], item["action"]) for item in data["items"]] == [
+        (page.id, "created"),
+        (page.id, "published"),
+    ]
+    assert data["items"][0]["detail_url"].endswith("/pages/%s/" % page.id)
+    assert data["meta"]["since"].endswith(".%s" % data["items"][-1]["id"])
+    assert data["meta"]["has_more"] is False
+    assert (
+        client.get(changes_url, {"since": data["meta"]["since"]}).json()["items"] == []
+    )
+
+
+def test_changes_feed_pages_with_limit(
+    client: Client, home_page: HomePage, changes_url
+):
+    ChangeLog.objects.all().delete()
+    for __ in range(3):
+        home_page.add_child(instance=HomePage(title="News"))
+
+    first = client.get(changes_url, {"limit": 2}).json()
+    second = client.get(
+        changes_url, {"limit": 2, "since": first["meta"]["since"]}
+    ).json()
+
+    assert len(first["items"]) == 2
+    assert first["meta"]["has_more"] is True
+    assert len(second["items"]) == 1
+    assert second["meta"]["has_more"] is False
+
+
+def test_changes_feed_holds_back_uncommitted_changes(client: Client, changes_url):
+    def connect():
+        wrapper = connection.copy()
+        wrapper.connect()
+        wrapper.set_autocommit(False)
+        return wrapper
+
+    def log_change(wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO home_changelog"
+                " (object_type, object_id, action, created_at, transaction_id)"
+                " VALUES ('page', 1, 'published', now(), txid_current())"
+                " RETURNING id"
+            )
+            return cursor.fetchone()[0]
+
+    since = client.get(changes_url).json()["meta"]["since"]
+    slow, fast = connect(), connect()
+    try:
+        first = log_change(slow)
+        second = log_change(fast)
+        fast.commit()
+
+        # the first change may still commit
+        assert client.get(changes_url, {"since": since}).json()["items"] == []
+
+        slow.commit()
+        data = client.get(changes_url, {"since": since}).json()
+        assert [item["id"] for item in data["items"]] == [first, second]
+    finally:
+        for wrapper in (slow, fast):
+            wrapper.rollback()
+            with wrapper.cursor() as cursor:
+                cursor.execute("DELETE FROM home_changelog WHERE object_id = 1")
+            wrapper.commit()
+            wrapper.close()
+
+
+def test_changes_feed_rejects_bad_parameters(client: Client, changes_url):
+    assert client.get(changes_url, {"since": "yesterday"}).status_code == 400
+    assert client.get(changes_url, {"type": "snippet"}).status_code == 400
+    assert client.get(changes_url, {"offset": 10}).status_code == 400
+
+
+def read_pages(client, url, **params):
+    items = []
+    params["cursor"] = ""
+    while params["cursor"] is not None:
+        data = client.get(url, params).json()
+        assert "total_count" not in data["meta"]
+        items.extend(item["id"] for item in data["items"])
+        params["cursor"] = data["meta"]["next_cursor"]
+    return items
+
+
+@pytest.mark.parametrize(
+    "order", [None, "-id", "title", "-first_published_at", "locale", "-locale"]
+)
+def test_cursor_pagination_walks_every_page(
+    client: Client, home_page: HomePage, pages_url, order
+):
+    for number in range(7):
+        page = home_page.add_child(instance=HomePage(title="Page %s" % (number % 3)))
+        if number % 2:
+            page.save_revision().publish()
+    params = {"limit": 2, "fields": "title,first_published_at"}
+    if order:
+        params["order"] = order
+    offset_ids = [
+        item["id"]
+        for item in client.get(pages_url, dict(params, limit=20)).json()["items"]
+    ]
+
+    ids = read_pages(client, pages_url, **params)
+
+    assert sorted(ids) == sorted(offset_ids)
+    assert len(ids) == len(set(ids))
+
+
+def test_cursor_pages_are_stable_while_publishing(
+    client: Client, home_page: HomePage, pages_url
+):
+    for number in range(4):
+        home_page.add_child(instance=HomePage(title="Page %s" % number))
+    first = client.get(pages_url, {"cursor": "", "limit": 2}).json()
+
+    home_page.add_child(instance=HomePage(title="Page 0 again"))
+    second = client.get(
+        pages_url, {"cursor": first["meta"]["next_cursor"], "limit": 2}
+    ).json()
+
+    assert second["items"][0]["id"] > first["items"][-1]["id"]
+
+
+def test_cursor_rejects_offset_and_foreign_cursors(client: Client, pages_url):
+    assert client.get(pages_url, {"cursor": "", "limit": 0}).status_code == 400
+    assert client.get(pages_url, {"cursor": "", "offset": 10}).status_code == 400
+    assert client.get(pages_url, {"cursor": "garbage"}).status_code == 400
+    cursor = CursorPagination().encode_cursor("title", "News", 1)
+    assert client.get(pages_url, {"cursor": cursor}).status_code == 400
@@ -0,0 +1,20 @@
+from django.conf import settings
+
+import core.home.tasks  # noqa: F401
+import core.search.tasks  # noqa: F401
+from config import celery_app
+
+
+def test_routes_name_registered_tasks():
+    assert set(settings.CELERY_TASK_ROUTES) <= set(celery_app.tasks)
+
+
+def test_tasks_are_routed_by_weight():
+    router = celery_app.amqp.router
+
+    def queue(name):
+        return router.route({}, name)["queue"].name
+
+    assert queue("core.search.tasks.reindex_chunk") == "heavy"
+    assert queue("core.home.tasks.send_form_submission_mail") == "light"
+    assert queue("core.users.tasks.get_users_count") == "default"
@@ -0,0 +1,74 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from celery.signals import task_failure
+from django.urls import reverse
+
+from config import celery_app
+from core.utils import celery_metrics
+
+
+@celery_app.task()
+def succeed():
+    return 1
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics(settings):
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    celery_metrics.store.clear()
+
+
+def get_value(name, **labels):
+    return celery_metrics.registry.get_sample_value(name, labels)
+
+
+def test_run_time_and_failures_are_recorded():
+    succeed.delay()
+    succeed.delay()
+    task_failure.send(sender=succeed, task_id="1", exception=ValueError())
+
+    assert get_value("celery_task_run_time_seconds_count", task=succeed.name) == 2
+    assert (
+        get_value("celery_task_run_time_seconds_bucket", task=succeed.name, le="+Inf")
+        == 2
+    )
+    assert get_value("celery_task_failures_total", task=succeed.name) == 1
+    assert get_value("celery_task_retries_total", task=succeed.name) is None
+
+
+def test_queue_wait_is_measured_from_publication():
+    task = SimpleNamespace(
+        name="core.tasks.slow",
+        request=SimpleNamespace(published_at=time.time() - 3, eta=None),
+    )
+
+    celery_metrics.record_queue_wait(task_id="1", task=task)
+
+    name = "celery_task_queue_wait_seconds"
+    assert get_value(name + "_bucket", task="core.tasks.slow", le="2.5") == 0
+    assert get_value(name + "_bucket", task="core.tasks.slow", le="5") == 1
+    assert get_value(name + "_sum", task="core.tasks.slow") >= 3
+
+
+@pytest.mark.django_db
+def test_metrics_view(admin_client):
+    succeed.delay()
+
+    response = admin_client.get(reverse("celery_metrics"))
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain")
+    sample = 'celery_task_run_time_seconds_count{task="%s"} 1.0' % succeed.name
+    assert sample in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_metrics_view_requires_staff_or_token(client, settings):
+    settings.CELERY_METRICS_TOKEN = "s3cret"
+    url = reverse("celery_metrics")
+
+    assert client.get(url).status_code == 403
+    assert client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code == 403
+    assert client.get(url, HTTP_AUTHORIZATION="Bearer s3cret").status_code == 200
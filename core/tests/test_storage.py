@@ -0,0 +1,93 @@
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+
+from core.utils.storage import BLOBS_DIR, ContentAddressedStorage
+
+
+def count_blobs(storage):
+    return sum(
+        len(filenames)
+        for __, __, filenames in os.walk(os.path.join(storage.location, BLOBS_DIR))
+    )
+
+
+def test_same_content_is_stored_once(tmp_path):
+    storage = ContentAddressedStorage(location=str(tmp_path))
+
+    first = storage.save("documents/a.pdf", ContentFile(b"%PDF-1.4 a"))
+    second = storage.save("documents/b.pdf", SimpleUploadedFile("b.pdf", b"%PDF-1.4 a"))
+    third = storage.save("documents/a.pdf", ContentFile(b"%PDF-1.4 c"))
+
+    assert first == "documents/a.pdf"
+    assert second == "documents/b.pdf"
+    assert third != first
+    assert storage.open(second).read() == b"%PDF-1.4 a"
+    assert storage.open(third).read() == b"%PDF-1.4 c"
+    assert os.path.samefile(storage.path(first), storage.path(second))
+    assert storage.references(first) == 2
+    assert count_blobs(storage) == 2
+
+
+def test_saving_a_local_file_moves_it(tmp_path):
+    storage = ContentAddressedStorage(location=str(tmp_path / "media"))
+    storage.save("original_images/a.jpg", ContentFile(b"JFIF"))
+    for name in ["new.jpg", "same.jpg"]:
+        (tmp_path / name).write_bytes(b"JFIF" if name == "same.jpg" else b"JFIF2")
+
+    new = storage.save_path("original_images/new.jpg", str(tmp_path / "new.jpg"))
+    same = storage.save_path("original_images/same.jpg", str(tmp_path / "same.jpg"))
+
+    assert not (tmp_path / "new.jpg").exists()
+    assert not (tmp_path / "same.jpg").exists()
+    # moved without being hashed
+    assert storage.references(same) == 0
+    assert count_blobs(storage) == 1
+
+    assert storage.deduplicate(new) is False
+    assert storage.deduplicate(same) is True
+    assert storage.deduplicate(same) is True
+    assert storage.open(new).read() == b"JFIF2"
+    assert storage.open(same).read() == b"JFIF"
+    assert storage.references(same) == 2
+    assert count_blobs(storage) == 2
+
+
+def test_other_directories_are_plain_files(tmp_path):
+    storage = ContentAddressedStorage(location=str(tmp_path))
+
+    first = storage.save("images/a.fill-100x100.jpg", ContentFile(b"JFIF"))
+    second = storage.save("form-submissions/b.csv", ContentFile(b"JFIF"))
+
+    assert storage.open(first).read() == storage.open(second).read() == b"JFIF"
+    assert os.stat(storage.path(first)).st_nlink == 1
+    assert storage.deduplicate(second) is False
+    assert count_blobs(storage) == 0
+
+
+def test_temporary_uploaded_file_is_moved(tmp_path):
+    storage = ContentAddressedStorage(location=str(tmp_path))
+    upload = TemporaryUploadedFile("a.zip", "application/zip", 3, None)
+    upload.write(b"PK!")
+    upload.flush()
+
+    name = storage.save("documents/a.zip", upload)
+    upload.close()
+
+    assert storage.open(name).read() == b"PK!"
+    assert count_blobs(storage) == 1
+
+
+def test_collect_garbage_deletes_unreferenced_blobs(tmp_path):
+    storage = ContentAddressedStorage(location=str(tmp_path))
+    kept = storage.save("documents/a.pdf", ContentFile(b"a"))
+    storage.save("documents/b.pdf", ContentFile(b"a"))
+    storage.save("documents/c.pdf", ContentFile(b"c"))
+
+    storage.delete("documents/b.pdf")
+    storage.delete("documents/c.pdf")
+
+    assert storage.collect_garbage() == (1, 1)
+    assert storage.open(kept).read() == b"a"
+    assert count_blobs(storage) == 1
@@ -0,0 +1,118 @@
+import pytest
+from celery.exceptions import SoftTimeLimitExceeded
+
+from config import celery_app
+from core.utils import locks
+from core.utils.tasks import QUEUED_LOCK, CheckpointedTask, UniqueTask
+
+# positions at which ``count_to`` hits its soft time limit, once each
+interruptions = []
+# positions counted by every run of ``count_to``
+counted = []
+
+
+@celery_app.task(bind=True, base=CheckpointedTask, max_resumes=3)
+def count_to(self, stop):
+    position = self.load_checkpoint(0)
+    while position < stop:
+        if position in interruptions:
+            interruptions.remove(position)
+            raise SoftTimeLimitExceeded()
+        counted.append(position)
+        position += 1
+        self.save_checkpoint(position)
+    return position
+
+
+@celery_app.task()
+def add_up(totals):
+    return sum(totals)
+
+
+# runs of ``record`` that entered its body
+recorded = []
+
+
+@celery_app.task(base=UniqueTask, lock_args=["name"])
+def record(name, value=None):
+    recorded.append((name, value))
+    if value == "nested":
+        # an identical run starting meanwhile is skipped
+        assert record.apply(args=(name,)).get() is None
+    return value
+
+
+@pytest.fixture(autouse=True)
+def reset(settings):
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    interruptions.clear()
+    counted.clear()
+    recorded.clear()
+
+
+def test_task_resumes_from_its_checkpoint():
+    interruptions.extend([2, 4])
+
+    result = count_to.apply(args=(5,))
+
+    assert result.get() == 5
+    assert counted == [0, 1, 2, 3, 4]
+
+
+def test_checkpoint_is_cleared_on_success():
+    result = count_to.apply(args=(3,), task_id="counted")
+    assert result.get() == 3
+
+    assert count_to.apply(args=(3,), task_id="counted").get() == 3
+    assert counted == [0, 1, 2, 0, 1, 2]
+
+
+def test_resumes_are_limited_to_max_resumes():
+    # failing eager runs can't be traced here, so count the resumes directly
+    count_to.push_request(id="limited")
+    try:
+        resumes = [count_to.count_resume() for __ in range(4)]
+    finally:
+        count_to.pop_request()
+
+    assert resumes == [True, True, True, False]
+
+
+def test_fan_out_aggregates_the_results_of_every_chunk():
+    interruptions.extend([1])
+
+    result = count_to.fan_out([(2,), (3,), (4,)], add_up.s())
+
+    assert result.get() == 9
+
+
+def test_locks_are_released_only_by_their_holder():
+    assert locks.acquire("test", "a", 10)
+    assert not locks.acquire("test", "b", 10)
+
+    locks.release("test", "b")
+    assert locks.get_holder("test") == "a"
+
+    locks.release("test", "a")
+    assert locks.get_holder("test") is None
+    assert locks.acquire("test", "b", 10)
+    locks.release("test", "b")
+
+
+def test_identical_running_task_is_skipped():
+    assert record.apply(args=("a", "nested")).get() == "nested"
+    assert recorded == [("a", "nested")]
+
+    assert record.apply(args=("a", "again")).get() == "again"
+
+
+def test_identical_queued_task_is_not_sent_again():
+    key = QUEUED_LOCK % record.get_lock_key(("a",), {"value": 1})
+    locks.acquire(key, "queued", 10)
+    try:
+        assert record.apply_async(("a",), {"value": 2}).id == "queued"
+        assert record.apply_async(("b",), {"value": 3}).get() == 3
+    finally:
+        locks.release(key, "queued")
+
+    assert recorded == [("b", 3)]
@@ -0,0 +1,59 @@
+import statistics
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, percent):
+    """Return the ``percent`` percentile of ``values`` (nearest rank)."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(int(round(percent / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def measure(client, urls, repeat=1):
+    """
+    Request each of ``urls`` ``repeat`` times with the django test ``client``.
+
+    Returns the latency percentiles, in milliseconds, and the mean and
+    maximum number of queries per request.
+    """
+    latencies = []
+    queries = []
+    for __ in range(repeat):
+        for url in urls:
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                raise ValueError("%s returned %s" % (url, response.status_code))
+            queries.append(len(captured))
+
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "queries_mean": round(statistics.mean(queries), 2),
+        "queries_max": max(queries),
+    }
+
+
+def compare(baseline, current, tolerance):
+    """
+    Return the ``(name, metric, before, after)`` of ``current`` that are
+    worse than ``baseline`` by more than ``tolerance`` (0.2 means 20%).
+    """
+    regressions = []
+    for name, metrics in current.items():
+        for metric, after in metrics.items():
+            before = baseline.get(name, {}).get(metric)
+            if metric == "requests" or before is None:
+                continue
+            if after > before * (1 + tolerance) and after - before > 1:
+                regressions.append((name, metric, before, after))
+    return regressions
@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django_redis import get_redis_connection as _get_redis_connection
+
+
+def get_redis_connection(alias="default"):
+    """
+    Return the raw redis client behind the ``alias`` cache.
+
+    Returns ``None`` when that cache is not served by django-redis, as is the
+    case of the LocMemCache used by the local and test settings, so callers
+    can fall back to a slower path.
+    """
+    try:
+        return _get_redis_connection(alias)
+    except NotImplementedError:
+        return None
+
+
+def get_generation(name):
+    """
+    Return the current generation number of ``name``.
+
+    Generations are counters kept in the default cache and included in cache
+    keys, so that ``bump_generation`` invalidates every key of a family at
+    once without having to know them.
+    """
+    key = "generation:%s" % name
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, 1, timeout=None)
+        generation = cache.get(key, 1)
+    return generation
+
+
+def bump_generation(name):
+    key = "generation:%s" % name
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+        return 2
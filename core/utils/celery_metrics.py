@@ -0,0 +1,219 @@
+"""
+Per-task metrics of the Celery app, in the Prometheus text format.
+
+Celery signals record, for each task name, how long tasks waited in the
+queue (from publication, or from their ETA, to the start of their run), how
+long they ran, and how many were retried or failed. The histograms are kept
+in a Redis hash shared by the web and worker processes, so the metrics of
+every worker child can be scraped from the worker (``CELERY_METRICS_PORT``)
+or from the Django ``celery_metrics`` view, which only answers staff users
+and scrapers sending ``Authorization: Bearer <CELERY_METRICS_TOKEN>``. When
+the default cache is not Redis they are kept in process memory instead.
+"""
+import datetime
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+
+from celery.signals import (
+    before_task_publish,
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_retry,
+    worker_ready,
+)
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    generate_latest,
+    start_http_server,
+)
+from prometheus_client.core import CounterMetricFamily, HistogramMetricFamily
+from redis.exceptions import RedisError
+
+from core.utils.cache import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = "celery:metrics"
+BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, math.inf)
+HISTOGRAMS = {
+    "queue_wait": "Seconds tasks waited in the queue before running",
+    "run_time": "Seconds tasks took to run",
+}
+COUNTERS = {
+    "retries": "Tasks retried",
+    "failures": "Tasks failed",
+}
+
+
+class MetricsStore:
+    """Counters of ``(metric, task name, field)``, in Redis or in memory."""
+
+    def __init__(self):
+        self.local = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def increment(self, increments):
+        """Add ``increments``, a ``{(metric, name, field): amount}`` dict."""
+        conn = get_redis_connection()
+        if conn is not None:
+            try:
+                pipe = conn.pipeline(transaction=False)
+                for field, amount in increments.items():
+                    pipe.hincrbyfloat(METRICS_KEY, "|".join(field), amount)
+                pipe.execute()
+                return
+            except RedisError as e:
+                logger.warning("Unable to record celery metrics in redis: %s", e)
+        with self.lock:
+            for field, amount in increments.items():
+                self.local[field] += amount
+
+    def observe(self, metric, name, value):
+        increments = {(metric, name, "count"): 1, (metric, name, "sum"): value}
+        for bucket in BUCKETS:
+            if value <= bucket:
+                increments[(metric, name, "le:%s" % bucket)] = 1
+        self.increment(increments)
+
+    def count(self, metric, name):
+        self.increment({(metric, name, "count"): 1})
+
+    def read(self):
+        conn = get_redis_connection()
+        if conn is not None:
+            try:
+                return {
+                    tuple(field.decode().split("|")): float(value)
+                    for field, value in conn.hgetall(METRICS_KEY).items()
+                }
+            except RedisError as e:
+                logger.warning("Unable to read celery metrics from redis: %s", e)
+        with self.lock:
+            return dict(self.local)
+
+    def clear(self):
+        conn = get_redis_connection()
+        if conn is not None:
+            conn.delete(METRICS_KEY)
+        with self.lock:
+            self.local.clear()
+
+
+class CeleryCollector:
+    def __init__(self, store):
+        self.store = store
+
+    def collect(self):
+        values = self.store.read()
+        names = defaultdict(set)
+        for metric, name, __ in values:
+            names[metric].add(name)
+
+        for metric, documentation in HISTOGRAMS.items():
+            family = HistogramMetricFamily(
+                "celery_task_%s_seconds" % metric, documentation, labels=["task"]
+            )
+            for name in sorted(names[metric]):
+                buckets = [
+                    (
+                        "+Inf" if bucket == math.inf else str(bucket),
+                        values.get((metric, name, "le:%s" % bucket), 0),
+                    )
+                    for bucket in BUCKETS
+                ]
+                family.add_metric([name], buckets, values.get((metric, name, "sum"), 0))
+            yield family
+
+        for metric, documentation in COUNTERS.items():
+            family = CounterMetricFamily(
+                "celery_task_%s" % metric, documentation, labels=["task"]
+            )
+            for name in sorted(names[metric]):
+                family.add_metric([name], values[(metric, name, "count")])
+            yield family
+
+
+store = MetricsStore()
+registry = CollectorRegistry(auto_describe=False)
+registry.register(CeleryCollector(store))
+
+# monotonic start time of the tasks running in this process, by task id
+_started = {}
+
+
+def render():
+    return generate_latest(registry)
+
+
+def has_metrics_access(request):
+    if request.user.is_staff:
+        return True
+    token = getattr(settings, "CELERY_METRICS_TOKEN", None)
+    scheme, __, credentials = request.headers.get("Authorization", "").partition(" ")
+    if not token or scheme != "Bearer":
+        return False
+    return constant_time_compare(credentials, token)
+
+
+def metrics_view(request):
+    if not has_metrics_access(request):
+        raise PermissionDenied
+    return HttpResponse(render(), content_type=CONTENT_TYPE_LATEST)
+
+
+@before_task_publish.connect
+def add_published_at(headers=None, **kwargs):
+    # message headers become attributes of the task request in the worker
+    if headers is not None:
+        headers.setdefault("published_at", time.time())
+
+
+@task_prerun.connect
+def record_queue_wait(task_id=None, task=None, **kwargs):
+    _started[task_id] = time.monotonic()
+    published_at = getattr(task.request, "published_at", None)
+    if published_at is None:
+        return
+    eta = getattr(task.request, "eta", None)
+    if eta:
+        # delayed tasks only start waiting at their eta
+        try:
+            eta = datetime.datetime.fromisoformat(eta).timestamp()
+            published_at = max(published_at, eta)
+        except (TypeError, ValueError):
+            pass
+    store.observe("queue_wait", task.name, max(time.time() - published_at, 0))
+
+
+@task_postrun.connect
+def record_run_time(task_id=None, task=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if started is not None:
+        store.observe("run_time", task.name, time.monotonic() - started)
+
+
+@task_retry.connect
+def record_retry(sender=None, **kwargs):
+    store.count("retries", sender.name)
+
+
+@task_failure.connect
+def record_failure(sender=None, **kwargs):
+    store.count("failures", sender.name)
+
+
+@worker_ready.connect
+def start_metrics_server(**kwargs):
+    port = getattr(settings, "CELERY_METRICS_PORT", None)
+    if port:
+        start_http_server(port, registry=registry)
+        logger.info("Serving celery metrics on port %s", port)
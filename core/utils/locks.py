@@ -0,0 +1,71 @@
+"""
+Locks shared by every process through Redis.
+
+``acquire`` sets the lock only if nobody holds it, with an expiry so that a
+holder that crashed doesn't keep it forever, and ``release`` deletes it only
+if it still holds the token of the caller, so a holder that outlived the
+expiry can't release the lock taken over by the next one.
+
+When the default cache is not Redis the locks fall back to ``cache.add``,
+which is atomic within that cache only, and when Redis is unavailable they
+are always acquired: a lock only saves duplicate work.
+"""
+import logging
+
+from django.core.cache import cache
+from redis.exceptions import RedisError
+
+from core.utils.cache import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = "lock:%s"
+
+# delete the lock only if it still holds the token of the caller
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def acquire(name, token, timeout):
+    """Take the lock ``name`` for ``timeout`` seconds if nobody holds it."""
+    key = LOCK_KEY % name
+    conn = get_redis_connection()
+    if conn is None:
+        return cache.add(key, token, timeout=timeout)
+    try:
+        return bool(conn.set(key, token, nx=True, ex=max(int(timeout), 1)))
+    except RedisError as e:
+        logger.warning("Unable to acquire lock %s in redis: %s", name, e)
+        return True
+
+
+def release(name, token):
+    """Release the lock ``name`` if it is still held with ``token``."""
+    key = LOCK_KEY % name
+    conn = get_redis_connection()
+    if conn is None:
+        if cache.get(key) == token:
+            cache.delete(key)
+        return
+    try:
+        conn.eval(RELEASE_SCRIPT, 1, key, token)
+    except RedisError as e:
+        logger.warning("Unable to release lock %s in redis: %s", name, e)
+
+
+def get_holder(name):
+    """Return the token holding the lock ``name``, if any."""
+    key = LOCK_KEY % name
+    conn = get_redis_connection()
+    if conn is None:
+        return cache.get(key)
+    try:
+        token = conn.get(key)
+    except RedisError as e:
+        logger.warning("Unable to read lock %s in redis: %s", name, e)
+        return None
+    return token.decode() if token is not None else None
@@ -0,0 +1,70 @@
+from collections.abc import Sequence
+
+
+class CountFreePage(Sequence):
+    """
+    Page of a ``CountFreePaginator``.
+
+    Offers the part of ``django.core.paginator.Page`` used to render
+    previous/next links, without knowing the total number of pages.
+    """
+
+    def __init__(self, object_list, number, has_next):
+        self.object_list = object_list
+        self.number = number
+        self._has_next = has_next
+
+    def __repr__(self):
+        return "<Page %s>" % self.number
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.number > 1
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class CountFreePaginator:
+    """
+    Paginator that never counts ``object_list``.
+
+    Each page is fetched as a single slice of ``per_page + 1`` items, the
+    extra item telling whether there is a next page. Unlike
+    ``django.core.paginator.Paginator``, a page past the end is returned
+    empty instead of being replaced by the last page.
+    """
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return 1
+        return max(number, 1)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page + 1
+        items = list(self.object_list[bottom:top])
+        return CountFreePage(
+            items[: self.per_page], number, has_next=len(items) > self.per_page
+        )
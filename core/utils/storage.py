@@ -0,0 +1,198 @@
+"""
+Content-addressed file storage.
+
+``ContentAddressedStorage`` writes each distinct content once, as a blob
+named by its sha256 under ``blobs/``, and stores every file with that
+content as a hard link to the blob. The files keep their usual names, so
+wagtail's documents and images work unchanged, while a package resubmitted
+with the same images and PDFs only adds links, without writing the data
+again.
+
+Only the files of the ``CONTENT_ADDRESSED_DIRS`` directories, the originals
+of the documents and images, are stored this way; renditions and every
+other file are plain files.
+
+Large local files, such as the packages assembled from chunked uploads,
+are moved in place by ``save_path`` without being read, and linked to their
+blob later by ``deduplicate``, which the ``deduplicate_stored_file`` task
+runs out of the request.
+
+The link count the filesystem keeps for each blob is its reference count:
+deleting a file only removes its link, and ``collect_garbage`` deletes the
+blobs left without any file.
+"""
+import hashlib
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+BLOBS_DIR = "blobs"
+TMP_PREFIX = ".tmp"
+# seconds after which a temporary file of an interrupted save is deleted
+TMP_MAX_AGE = 24 * 60 * 60
+BLOCK_SIZE = 1024 * 1024
+
+
+def get_file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that stores each distinct content only once."""
+
+    def __init__(self, *args, content_addressed_dirs=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._content_addressed_dirs = content_addressed_dirs
+
+    @property
+    def content_addressed_dirs(self):
+        if self._content_addressed_dirs is None:
+            return settings.CONTENT_ADDRESSED_DIRS
+        return self._content_addressed_dirs
+
+    def is_content_addressed(self, name):
+        directory = str(name).replace("\\", "/").split("/")[0]
+        return directory in self.content_addressed_dirs
+
+    def blob_path(self, digest):
+        return os.path.join(self.location, BLOBS_DIR, digest[:2], digest[2:4], digest)
+
+    def _save(self, name, content):
+        if not self.is_content_addressed(name):
+            return super()._save(name, content)
+        if hasattr(content, "temporary_file_path"):
+            return self._save_path(name, content.temporary_file_path())
+
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        blob = self.blob_path(digest.hexdigest())
+        try:
+            return self._link(blob, name)
+        except FileNotFoundError:
+            pass
+        tmp_path = self._get_tmp_path(os.path.dirname(blob))
+        with open(tmp_path, "wb") as fp:
+            for chunk in content.chunks():
+                fp.write(chunk)
+        return self._publish(tmp_path, blob, name)
+
+    def save_path(self, name, path):
+        """
+        Move the local file at ``path`` to ``name``, renaming it into place
+        when both are on the same filesystem, without reading it; see
+        ``deduplicate``.
+        """
+        name = self.get_available_name(name)
+        tmp_path = self._get_tmp_path(os.path.join(self.location, BLOBS_DIR))
+        file_move_safe(path, tmp_path, allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(tmp_path, self.file_permissions_mode)
+        name = self._link(tmp_path, name)
+        os.remove(tmp_path)
+        return name
+
+    def deduplicate(self, name):
+        """
+        Make the file ``name`` a link to the blob of its content, storing it
+        as that blob if it is new, and return whether the content was stored
+        already.
+        """
+        if not self.is_content_addressed(name):
+            return False
+        full_path = self.path(name)
+        try:
+            blob = self.blob_path(get_file_digest(full_path))
+        except FileNotFoundError:
+            # deleted meanwhile
+            return False
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        while True:
+            try:
+                os.link(full_path, blob)
+                return False
+            except FileExistsError:
+                pass
+            if os.path.samefile(full_path, blob):
+                return True
+            tmp_path = self._get_tmp_path(os.path.dirname(blob))
+            os.remove(tmp_path)
+            try:
+                os.link(blob, tmp_path)
+            except FileNotFoundError:
+                # collect_garbage deleted the blob meanwhile
+                continue
+            os.replace(tmp_path, full_path)
+            return True
+
+    def _save_path(self, name, path):
+        blob = self.blob_path(get_file_digest(path))
+        try:
+            name = self._link(blob, name)
+        except FileNotFoundError:
+            tmp_path = self._get_tmp_path(os.path.dirname(blob))
+            file_move_safe(path, tmp_path, allow_overwrite=True)
+            return self._publish(tmp_path, blob, name)
+        os.remove(path)
+        return name
+
+    def _get_tmp_path(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=TMP_PREFIX)
+        os.close(fd)
+        return tmp_path
+
+    def _publish(self, tmp_path, blob, name):
+        """Store the new content at ``tmp_path`` as ``name`` and as ``blob``."""
+        if self.file_permissions_mode is not None:
+            os.chmod(tmp_path, self.file_permissions_mode)
+        # linked before the blob, which a concurrent collect_garbage could
+        # delete as soon as it exists
+        name = self._link(tmp_path, name)
+        try:
+            os.link(tmp_path, blob)
+        except FileExistsError:
+            # the same content was saved meanwhile, this file keeps a copy
+            pass
+        os.remove(tmp_path)
+        return name
+
+    def _link(self, blob, name):
+        while True:
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            try:
+                os.link(blob, full_path)
+            except FileExistsError:
+                name = self.get_available_name(name)
+            else:
+                return str(name).replace("\\", "/")
+
+    def references(self, name):
+        """Return how many files, ``name`` included, link to its blob."""
+        return os.stat(self.path(name)).st_nlink - 1
+
+    def collect_garbage(self):
+        """Delete the blobs no file links to; return their number and size."""
+        count = size = 0
+        expired = time.time() - TMP_MAX_AGE
+        for directory, __, filenames in os.walk(os.path.join(self.location, BLOBS_DIR)):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                stat = os.stat(path)
+                if filename.startswith(TMP_PREFIX):
+                    if stat.st_mtime < expired:
+                        os.remove(path)
+                elif stat.st_nlink == 1:
+                    os.remove(path)
+                    count += 1
+                    size += stat.st_size
+        return count, size
@@ -0,0 +1,221 @@
+"""
+Base classes of Celery tasks.
+
+A ``CheckpointedTask`` saves its progress with ``save_checkpoint`` as it
+goes. When the soft time limit interrupts it, it replaces itself with a new
+run of the same task, under the same task id, that picks the progress back
+up with ``load_checkpoint`` instead of starting over. Keeping the task id
+keeps the results and the chord of the original run pointing at the new
+one, so a ``fan_out`` of checkpointed chunks still aggregates every result.
+
+A ``UniqueTask`` runs at most once at a time for the same arguments: sending
+it while an identical run is queued returns the queued one, and a run that
+starts while another identical one is running is skipped. It keeps periodic
+tasks that take longer than their interval, or that are sent again when a
+worker restarts, from piling up.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import logging
+
+from celery import Task, chord
+from celery.exceptions import SoftTimeLimitExceeded
+from celery.utils import uuid
+from django.conf import settings
+from django.core.cache import cache
+
+from core.utils import locks
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_KEY = "task:checkpoint:%s"
+RESUMES_KEY = "task:resumes:%s"
+QUEUED_LOCK = "task:queued:%s"
+RUNNING_LOCK = "task:running:%s"
+
+
+def _wrap_run(cls, decorator):
+    """
+    Replace the function given to the ``task`` decorator of ``cls`` by
+    ``decorator(run)``, where ``run`` takes the task as first argument.
+
+    The worker calls ``run`` directly unless ``__call__`` is overridden, and
+    overriding it loses the request of eager runs, so ``run`` is wrapped.
+    """
+    run = cls.__dict__.get("run")
+    if run is None:
+        return
+    if isinstance(run, staticmethod):
+        function = run.__func__
+
+        @functools.wraps(function)
+        def run(self, *args, **kwargs):
+            return function(*args, **kwargs)
+
+    cls.run = decorator(run)
+
+
+def _resume_on_soft_time_limit(run):
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        try:
+            result = run(self, *args, **kwargs)
+        except SoftTimeLimitExceeded:
+            if not self.count_resume():
+                raise
+            return self.resume(args, kwargs)
+        self.clear_checkpoint()
+        return result
+
+    return wrapper
+
+
+class CheckpointedTask(Task):
+    """
+    Task resumed from its last checkpoint after a soft time limit.
+
+    The tasks must be bound to use the checkpoints::
+
+        @celery_app.task(bind=True, base=CheckpointedTask)
+        def import_items(self, ids):
+            done = self.load_checkpoint() or 0
+            for position in range(done, len(ids)):
+                import_item(ids[position])
+                self.save_checkpoint(position + 1)
+            return len(ids)
+
+    The checkpoint is cleared once the task returns, and kept when it raises
+    so that a ``retry``, which keeps the task id too, also resumes from it.
+    """
+
+    #: Times a run is resumed before its soft time limit is let through
+    max_resumes = None
+    #: Seconds a checkpoint is kept after it was last saved
+    checkpoint_timeout = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _wrap_run(cls, _resume_on_soft_time_limit)
+
+    def get_max_resumes(self):
+        if self.max_resumes is None:
+            return settings.CELERY_TASK_MAX_RESUMES
+        return self.max_resumes
+
+    def get_checkpoint_timeout(self):
+        if self.checkpoint_timeout is None:
+            return settings.CELERY_TASK_CHECKPOINT_TIMEOUT
+        return self.checkpoint_timeout
+
+    def load_checkpoint(self, default=None):
+        """Return the state last saved by this run or the ones it resumes."""
+        return cache.get(CHECKPOINT_KEY % self.request.id, default)
+
+    def save_checkpoint(self, state):
+        """Save ``state``, which must be serializable by the cache."""
+        key = CHECKPOINT_KEY % self.request.id
+        cache.set(key, state, timeout=self.get_checkpoint_timeout())
+
+    def clear_checkpoint(self):
+        cache.delete_many(
+            [CHECKPOINT_KEY % self.request.id, RESUMES_KEY % self.request.id]
+        )
+
+    def count_resume(self):
+        """Count one more resume, returning False past ``max_resumes``."""
+        key = RESUMES_KEY % self.request.id
+        resumes = cache.get(key, 0) + 1
+        if resumes > self.get_max_resumes():
+            logger.error(
+                "%s[%s] was resumed %d times, giving up",
+                self.name,
+                self.request.id,
+                resumes - 1,
+            )
+            return False
+        cache.set(key, resumes, timeout=self.get_checkpoint_timeout())
+        logger.warning(
+            "%s[%s] hit its soft time limit, resuming from its checkpoint (%d/%d)",
+            self.name,
+            self.request.id,
+            resumes,
+            self.get_max_resumes(),
+        )
+        return True
+
+    def resume(self, args, kwargs):
+        """Replace this run with a new one of the same arguments and task id."""
+        return self.replace(self.signature(args, kwargs))
+
+    def fan_out(self, arguments, callback):
+        """
+        Run this task once for each tuple of ``arguments``, in parallel, and
+        then the ``callback`` signature with the list of their results.
+        """
+        return chord(self.s(*args) for args in arguments)(callback)
+
+
+def _run_once(run):
+    @functools.wraps(run)
+    def wrapper(self, *args, **kwargs):
+        key = self.get_lock_key(args, kwargs)
+        token = self.request.id or uuid()
+        locks.release(QUEUED_LOCK % key, token)
+        if not locks.acquire(RUNNING_LOCK % key, token, self.get_lock_timeout()):
+            logger.info(
+                "%s[%s] skipped, an identical run is in progress", self.name, token
+            )
+            return None
+        try:
+            return run(self, *args, **kwargs)
+        finally:
+            locks.release(RUNNING_LOCK % key, token)
+
+    return wrapper
+
+
+class UniqueTask(Task):
+    """
+    Task of which only one run is queued and one running for the same name
+    and lock arguments at a time::
+
+        @celery_app.task(base=UniqueTask, lock_args=["page_id"])
+        def export_page(page_id, user_id):
+            ...
+
+    The locks expire after the time limit of the task, when a worker killed
+    in the middle of a run can't release them anymore.
+    """
+
+    #: Names of the arguments identifying a run, all of them when None
+    lock_args = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _wrap_run(cls, _run_once)
+
+    def get_lock_key(self, args, kwargs):
+        arguments = inspect.signature(self.__header__).bind(*args, **kwargs)
+        arguments.apply_defaults()
+        values = arguments.arguments
+        if self.lock_args is not None:
+            values = {name: values[name] for name in self.lock_args}
+        digest = hashlib.sha1(
+            json.dumps(values, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return "%s:%s" % (self.name, digest)
+
+    def get_lock_timeout(self):
+        return self.time_limit or self.app.conf.task_time_limit or 60 * 60
+
+    def apply_async(self, args=None, kwargs=None, task_id=None, **options):
+        task_id = task_id or uuid()
+        key = QUEUED_LOCK % self.get_lock_key(args or (), kwargs or {})
+        if not locks.acquire(key, task_id, self.get_lock_timeout()):
+            queued_id = locks.get_holder(key)
+            if queued_id is not None and queued_id != task_id:
+                logger.info("%s[%s] is already queued", self.name, queued_id)
+                return self.AsyncResult(queued_id)
+        return super().apply_async(args, kwargs, task_id=task_id, **options)